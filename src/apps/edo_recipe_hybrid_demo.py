@@ -9,6 +9,7 @@ pg_bigm（全文検索）とpg_vector（ベクトル検索）を組み合わせ
 import sys
 import os
 import traceback
+from dataclasses import replace
 from typing import List, Dict, Optional
 
 # Add src to path for imports
@@ -51,10 +52,13 @@ class HybridSearchDemo:
                     self._run_performance_comparison()
                 elif choice == "4":
                     self._run_basic_data_initialization()
+                    self.search_service.clear_cache()  # Data changed: drop cached search results
                 elif choice == "5":
                     self._run_vector_initialization()
+                    self.search_service.clear_cache()
                 elif choice == "6":
                     self._run_data_cleanup()
+                    self.search_service.clear_cache()
                 elif choice == "7":
                     print("\n👋 デモを終了します。ありがとうございました！")
                     break
@@ -71,6 +75,8 @@ class HybridSearchDemo:
                 print("詳細:")
                 traceback.print_exc()
                 input("何かキーを押して続行...")
+        
+        self.search_service.close()
     
     def _show_main_menu(self) -> str:
         """メインメニュー表示"""
@@ -257,8 +263,9 @@ class HybridSearchDemo:
                     weight_input = input(f"キーワード重み [0.0-1.0] (現在: {condition.fulltext_weight:.1f}): ").strip()
                     if weight_input:
                         try:
-                            condition.fulltext_weight = float(weight_input)
-                            condition.vector_weight = 1.0 - condition.fulltext_weight
+                            fulltext_weight = float(weight_input)
+                            condition = replace(condition, fulltext_weight=fulltext_weight,
+                                                vector_weight=1.0 - fulltext_weight)
                         except ValueError:
                             pass
                 
@@ -357,7 +364,7 @@ class HybridSearchDemo:
             
             for mode, name in modes:
                 print(f"🔍 {name}を実行中...")
-                test_condition = SearchCondition(**{**condition.__dict__, 'search_mode': mode})
+                test_condition = replace(condition, search_mode=mode)
                 response = self.search_service.search_recipes(test_condition)
                 results[mode] = response
                 
@@ -645,7 +652,7 @@ class HybridSearchDemo:
                                 INSERT INTO edo_recipe_vectors 
                                 (recipe_id, description_text, ingredients_text, instructions_text, 
                                  combined_text, combined_embedding) 
-                                VALUES (%s, %s, '', '', %s, %s::vector)
+                                VALUES (%s, %s, '', '', %s, l2_normalize(%s::halfvec))
                             ''', (recipe_id, description, text_to_embed, embedding))
                             
                             manager.conn.commit()
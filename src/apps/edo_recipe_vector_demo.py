@@ -8,6 +8,7 @@ Usage:
     python edo_recipe_vector_demo.py
 """
 
+import logging
 import sys
 from pathlib import Path
 
@@ -110,6 +111,9 @@ def setup_vector_database_and_generate_embeddings(vector_manager: EdoRecipeVecto
         print()
     else:
         print("✓ ベクターテーブルは既に存在します")
+        # 旧スキーマ（SMALLINTのID・vector型の埋め込みなど）を現在のスキーマに移行
+        if not vector_manager.migrate_vector_schema():
+            return False
         print()
     
     # 既存ベクターデータ確認
@@ -176,13 +180,13 @@ def setup_vector_database_and_generate_embeddings(vector_manager: EdoRecipeVecto
     
     # データベースに保存
     print(f"\n💾 {len(processed_recipes)}件のベクターデータを保存中...")
-    save_count = 0
-    
-    for recipe_data in processed_recipes:
-        if vector_manager.insert_recipe_vectors(recipe_data):
-            save_count += 1
+    save_count = vector_manager.insert_recipe_vectors_batch(processed_recipes)
     
     print(f"✓ {save_count}件のベクターデータを保存しました\n")
+    
+    # データ投入後にベクター検索用インデックスを作成（IVFFlatはここで構築）
+    if not vector_manager.create_vector_indexes():
+        return False
     return True
 
 
@@ -401,6 +405,9 @@ def run_edo_recipe_vector_demo() -> bool:
 
 def main() -> None:
     """メイン関数"""
+    # 共通ライブラリのログをこれまでのprint出力と同じ形式で表示
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     success = run_edo_recipe_vector_demo()
     
     if not success:
@@ -1,5 +1,7 @@
+import json
 import time
 import asyncio
+import functools
 from typing import List, Optional, Dict, Any
 import openai
 from openai import OpenAI
@@ -8,6 +10,22 @@ import tiktoken
 from ..config.embedding_config import EmbeddingConfig
 
 
+# Tokenizer used by the text-embedding models
+_ENCODING_NAME = "cl100k_base"
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(name: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process"""
+    return tiktoken.get_encoding(name)
+
+
+@functools.lru_cache(maxsize=1024)
+def _count_tokens(text: str) -> int:
+    """Count tokens for a text, memoized for repeated inputs"""
+    return len(_get_encoding(_ENCODING_NAME).encode(text))
+
+
 class OpenAIEmbeddingClient:
     """OpenAI embedding API client (SRP compliance)"""
     
@@ -20,7 +38,7 @@ class OpenAIEmbeddingClient:
         config.validate()
         self.config = config
         self.client = OpenAI(api_key=config.openai_api_key)
-        self._encoding = tiktoken.get_encoding("cl100k_base")  # For text-embedding models
+        self._encoding = _get_encoding(_ENCODING_NAME)  # For text-embedding models
     
     def get_embeddings_sync(self, texts: List[str]) -> List[List[float]]:
         """Get embeddings for multiple texts synchronously
@@ -88,6 +106,89 @@ class OpenAIEmbeddingClient:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.get_embeddings_sync, texts)
     
+    def get_embeddings_batch(self, requests: Dict[str, List[str]],
+                             poll_interval: float = 30.0,
+                             timeout: Optional[float] = None) -> Dict[str, List[List[float]]]:
+        """Get embeddings for many requests through the OpenAI Batch API
+        
+        The Batch API is billed at half the synchronous price, but results are
+        only guaranteed within 24 hours. Use it for latency-insensitive work.
+        
+        Args:
+            requests: Mapping of custom_id to the texts embedded by that request
+            poll_interval: Seconds to wait between batch status checks
+            timeout: Maximum seconds to wait for completion (None waits indefinitely)
+        
+        Returns:
+            Mapping of custom_id to embedding vectors (in input order)
+        
+        Raises:
+            ValueError: If requests is empty or contains an empty text list
+            RuntimeError: If the batch does not complete successfully
+            TimeoutError: If the batch does not finish within timeout
+            openai.APIError: If OpenAI API call fails
+        """
+        if not requests:
+            raise ValueError("バッチリクエストが空です")
+        if any(not texts for texts in requests.values()):
+            raise ValueError("テキストリストが空のリクエストがあります")
+            
+        batch_input = "".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {"model": self.config.embedding_model, "input": texts}
+            }, ensure_ascii=False) + "\n"
+            for custom_id, texts in requests.items()
+        )
+            
+        try:
+            input_file = self.client.files.create(
+                file=("embedding_batch.jsonl", batch_input.encode("utf-8")),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/embeddings",
+                completion_window="24h"
+            )
+            print(f"✓ バッチジョブを作成しました: {batch.id} ({len(requests)}リクエスト)")
+            
+            deadline = time.time() + timeout if timeout is not None else None
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                if deadline is not None and time.time() >= deadline:
+                    raise TimeoutError(f"バッチジョブが時間内に完了しませんでした: {batch.id} ({batch.status})")
+                time.sleep(poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+            
+            if batch.status != "completed" or not batch.output_file_id:
+                raise RuntimeError(f"バッチジョブが失敗しました: {batch.id} ({batch.status})")
+            
+            output = self.client.files.content(batch.output_file_id).text
+        
+        except openai.APIError as e:
+            self._handle_api_error(e)
+            raise
+        
+        results = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                raise RuntimeError(f"バッチリクエストが失敗しました: {record['custom_id']}")
+            data = sorted(response["body"]["data"], key=lambda item: item["index"])
+            results[record["custom_id"]] = [item["embedding"] for item in data]
+        
+        missing = requests.keys() - results.keys()
+        if missing:
+            raise RuntimeError(f"バッチ結果が不足しています: {sorted(missing)}")
+        
+        print(f"✓ バッチジョブから{sum(len(v) for v in results.values())}件の埋め込みを取得しました")
+        return results
+    
     def _handle_api_error(self, error: openai.APIError) -> None:
         """Handle OpenAI API errors with Japanese messages
         
@@ -117,12 +218,7 @@ class OpenAIEmbeddingClient:
         Returns:
             Approximate total token count
         """
-        total_tokens = 0
-        for text in texts:
-            tokens = len(self._encoding.encode(text))
-            total_tokens += tokens
-        
-        return total_tokens
+        return sum(map(_count_tokens, texts))
     
     def validate_embedding_dimensions(self, embedding: List[float]) -> bool:
         """Validate embedding dimensions
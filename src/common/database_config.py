@@ -1,6 +1,52 @@
 import os
+import atexit
+import threading
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """上限に達した場合に例外ではなく接続の返却を待つコネクションプール
+    
+    ThreadedConnectionPoolは接続数が上限に達するとgetconnでPoolErrorを送出するため、
+    同時実行数が上限を超える場合はセマフォで返却を待機させる。
+    """
+    
+    def __init__(self, minconn: int, maxconn: int, *args, timeout: Optional[float] = None, **kwargs):
+        """BlockingConnectionPoolを初期化
+        
+        Args:
+            minconn: 最小接続数
+            maxconn: 最大接続数
+            timeout: 接続の返却を待つ最大時間（秒、Noneで無制限）
+        """
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+    
+    def getconn(self, key=None):
+        """接続を取得（空きがない場合は返却を待つ）
+        
+        Raises:
+            PoolError: timeout秒待っても接続が返却されなかった場合
+        """
+        if not self._slots.acquire(timeout=self._timeout):
+            raise PoolError(f"connection pool exhausted (waited {self._timeout} seconds)")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def putconn(self, conn=None, key=None, close=False):
+        """接続をプールに返却し、待機中の取得要求を再開させる"""
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            # 返却に失敗しても枠は解放する（解放しないと待機中の取得要求がタイムアウトまで止まる）
+            self._slots.release()
 
 @dataclass
 class DatabaseConfig:
@@ -11,6 +57,16 @@ class DatabaseConfig:
     user: str
     password: str
     
+    # ベクター検索インデックス設定
+    index_type: str = 'hnsw'  # 'hnsw' または 'ivfflat'
+    ivfflat_probes: int = 10
+    hnsw_ef_search: int = 40
+    
+    # コネクションプール設定
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_timeout: float = 30.0  # 接続の空きを待つ最大時間（秒）
+    
     @classmethod
     def from_environment(cls) -> 'DatabaseConfig':
         """環境変数から設定を読み込み
@@ -26,7 +82,13 @@ class DatabaseConfig:
             port='5432',  # Container 側のポート 固定設定
             database=os.getenv('POSTGRES_DB', 'mydatabase'),
             user=os.getenv('POSTGRES_USER', 'postgres'),
-            password=os.getenv('POSTGRES_PASSWORD', 'mysecretpassword')
+            password=os.getenv('POSTGRES_PASSWORD', 'mysecretpassword'),
+            index_type=os.getenv('VECTOR_INDEX_TYPE', 'hnsw'),
+            ivfflat_probes=int(os.getenv('IVFFLAT_PROBES', '10')),
+            hnsw_ef_search=int(os.getenv('HNSW_EF_SEARCH', '40')),
+            pool_min_size=int(os.getenv('POSTGRES_POOL_MIN_SIZE', '1')),
+            pool_max_size=int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+            pool_timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', '30'))
         )
     
     def to_connection_params(self) -> Dict[str, str]:
@@ -39,6 +101,41 @@ class DatabaseConfig:
             'password': self.password
         }
     
+    def get_connection_pool(self) -> BlockingConnectionPool:
+        """接続先ごとに共有されるコネクションプールを取得
+        
+        同じ接続先・プール設定からは同一のプールを返すため、検索ごとの接続確立（認証ハンドシェイク）を省略できる。
+        pool_min_size/pool_max_size/pool_timeoutが異なる設定には別のプールを作成する。
+        接続数が上限に達している場合、getconnは例外ではなく返却を待機する（最大pool_timeout秒）。
+        
+        Returns:
+            スレッドセーフなコネクションプール
+        """
+        params = self.to_connection_params()
+        key = (tuple(sorted(params.items())), self.pool_min_size, self.pool_max_size, self.pool_timeout)
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool.closed:
+                pool = BlockingConnectionPool(self.pool_min_size, self.pool_max_size,
+                                              timeout=self.pool_timeout, **params)
+                _pools[key] = pool
+            return pool
+    
     def __str__(self) -> str:
         """接続情報の表示（パスワードは隠蔽）"""
-        return f"DatabaseConfig(host={self.host}, port={self.port}, database={self.database}, user={self.user})"
\ No newline at end of file
+        return f"DatabaseConfig(host={self.host}, port={self.port}, database={self.database}, user={self.user})"
+
+
+# 接続先ごとのコネクションプール（プロセス内で共有）
+_pools: Dict[Tuple, BlockingConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+@atexit.register
+def close_connection_pools() -> None:
+    """全てのコネクションプールの接続を閉じる（プロセス終了時にも自動実行）"""
+    with _pools_lock:
+        for pool in _pools.values():
+            if not pool.closed:
+                pool.closeall()
+        _pools.clear()
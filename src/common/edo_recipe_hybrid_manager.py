@@ -2,7 +2,6 @@
 EdoRecipeHybridManager for combined pg_bigm and pg_vector search operations.
 Implements efficient hybrid search with both full-text and vector similarity.
 """
-import psycopg2
 import time
 import os
 from psycopg2 import Error
@@ -13,6 +12,7 @@ from .database_config import DatabaseConfig
 from .search_models import SearchCondition, SearchResult, SearchStage, PerformanceMetrics
 from .edo_recipe_manager import EdoRecipeManager
 from .edo_recipe_vector_manager import EdoRecipeVectorManager
+from .vector_utils import l2_normalize, to_halfvec_literal
 
 # Import OpenAI client for embedding generation
 try:
@@ -38,29 +38,56 @@ class EdoRecipeHybridManager:
         self.conn: Optional[connection] = None
         self.cur = None
         
-        # Existing managers for compatibility
-        self.fulltext_manager = EdoRecipeManager(db_config)
-        self.vector_manager = EdoRecipeVectorManager(db_config)
+        # Existing managers for compatibility (connected on first access)
+        self._fulltext_manager: Optional[EdoRecipeManager] = None
+        self._vector_manager: Optional[EdoRecipeVectorManager] = None
         
         # Initialize OpenAI client for embedding generation
-        self.openai_client = None
-        if OpenAIEmbeddingClient and EmbeddingConfig:
-            try:
-                config = EmbeddingConfig.from_environment()
-                self.openai_client = OpenAIEmbeddingClient(config)
-                print("✅ OpenAIクライアント初期化成功")
-            except Exception as e:
-                print(f"⚠️  OpenAIクライアント初期化失敗: {e}")
-                print("ベクトル検索機能は使用できません")
+        self.openai_client = self.create_openai_client()
+        self.embedding_failed = False  # True once a requested query embedding could not be generated
         
         self._connect()
     
+    @staticmethod
+    def create_openai_client() -> Optional["OpenAIEmbeddingClient"]:
+        """埋め込み生成用のOpenAIクライアントを作成（DB接続は不要）
+        
+        Returns:
+            OpenAIクライアント、利用できない場合はNone
+        """
+        if not (OpenAIEmbeddingClient and EmbeddingConfig):
+            return None
+        
+        try:
+            config = EmbeddingConfig.from_environment()
+            client = OpenAIEmbeddingClient(config)
+            print("✅ OpenAIクライアント初期化成功")
+            return client
+        except Exception as e:
+            print(f"⚠️  OpenAIクライアント初期化失敗: {e}")
+            print("ベクトル検索機能は使用できません")
+            return None
+    
+    @property
+    def fulltext_manager(self) -> EdoRecipeManager:
+        """既存の全文検索マネージャー（初回アクセス時に接続）"""
+        if self._fulltext_manager is None:
+            self._fulltext_manager = EdoRecipeManager(self.db_config)
+        return self._fulltext_manager
+    
+    @property
+    def vector_manager(self) -> EdoRecipeVectorManager:
+        """既存のベクトルマネージャー（初回アクセス時に接続）"""
+        if self._vector_manager is None:
+            self._vector_manager = EdoRecipeVectorManager(self.db_config)
+        return self._vector_manager
+    
     def _connect(self) -> None:
-        """データベースに接続"""
+        """コネクションプールから接続を取得"""
         try:
-            self.conn = psycopg2.connect(**self.db_config.to_connection_params())
+            self.conn = self.db_config.get_connection_pool().getconn()
             self.cur = self.conn.cursor()
-            print(f"ハイブリッド検索マネージャーがデータベースに接続しました: {self.db_config}")
+            print(f"ハイブリッド検索マネージャーがデータベース接続を取得しました: {self.db_config}")
         except Error as e:
             print(f"PostgreSQL接続エラー: {e}")
             raise
@@ -152,12 +179,14 @@ class EdoRecipeHybridManager:
             print(f"全文検索フィルタリングエラー: {e}")
             raise
     
-    def rank_by_vector_similarity(self, recipe_ids: List[int], query_text: str) -> Tuple[List[SearchResult], SearchStage]:
+    def rank_by_vector_similarity(self, recipe_ids: List[int], query_text: str,
+                                  query_vector: Optional[List[float]] = None) -> Tuple[List[SearchResult], SearchStage]:
         """ベクトル類似度による並び替え
         
         Args:
             recipe_ids: 対象レシピIDリスト
             query_text: ベクトル検索クエリテキスト
+            query_vector: 事前に計算済みのクエリ埋め込み（省略時はquery_textから生成）
             
         Returns:
             (search_results, search_stage): 結果リストとステージ情報
@@ -168,7 +197,8 @@ class EdoRecipeHybridManager:
         start_time = time.time()
         
         # Get query vector from OpenAI client
-        query_vector = self.get_text_embedding(query_text)
+        if query_vector is None:
+            query_vector = self.get_text_embedding(query_text)
         if not query_vector:
             return [], SearchStage("ベクトル検索", len(recipe_ids), 0, 0.0)
         
@@ -179,7 +209,7 @@ class EdoRecipeHybridManager:
             r.name as recipe_name,
             r.description,
             '' as ingredients,
-            1 - (rv.combined_embedding <=> %s::vector) as vector_score
+            -(rv.combined_embedding <#> %s::halfvec) as vector_score
         FROM edo_recipes r
         JOIN edo_recipe_vectors rv ON r.id = rv.recipe_id
         WHERE r.id = ANY(%s)
@@ -187,7 +217,9 @@ class EdoRecipeHybridManager:
         """
         
         try:
-            self.cur.execute(sql_query, (query_vector, recipe_ids))
+            if self.db_config.index_type == 'ivfflat':
+                self.cur.execute(f"SET LOCAL ivfflat.probes = {int(self.db_config.ivfflat_probes)};")
+            self.cur.execute(sql_query, (to_halfvec_literal(l2_normalize(query_vector)), recipe_ids))
             rows = self.cur.fetchall()
             
             results = []
@@ -219,6 +251,84 @@ class EdoRecipeHybridManager:
             print(f"ベクトル検索エラー: {e}")
             raise
     
+    def rank_by_vector_similarity_all(self, query_text: str, limit: int,
+                                      query_vector: Optional[List[float]] = None) -> Tuple[List[SearchResult], SearchStage]:
+        """全レシピを対象としたベクトル類似度上位k件の取得
+        
+        ORDER BY に距離演算子を直接使用し、ベクトルインデックスによる近傍探索で上位k件のみを取得する。
+        
+        Args:
+            query_text: ベクトル検索クエリテキスト
+            limit: 取得件数
+            query_vector: 事前に計算済みのクエリ埋め込み（省略時はquery_textから生成）
+            
+        Returns:
+            (search_results, search_stage): 結果リストとステージ情報
+        """
+        if not query_text:
+            return [], SearchStage("ベクトル検索", 0, 0, 0.0)
+        
+        start_time = time.time()
+        
+        # Get query vector from OpenAI client
+        if query_vector is None:
+            query_vector = self.get_text_embedding(query_text)
+        if not query_vector:
+            return [], SearchStage("ベクトル検索", -1, 0, 0.0)
+        
+        sql_query = """
+        SELECT 
+            r.id as recipe_id,
+            r.name as recipe_name,
+            r.description,
+            '' as ingredients,
+            -nn.distance as vector_score
+        FROM (
+            SELECT recipe_id, combined_embedding <#> %s::halfvec as distance
+            FROM edo_recipe_vectors
+            WHERE combined_embedding IS NOT NULL
+            ORDER BY distance
+            LIMIT %s
+        ) nn
+        JOIN edo_recipes r ON r.id = nn.recipe_id
+        ORDER BY nn.distance
+        """
+        
+        try:
+            if self.db_config.index_type == 'ivfflat':
+                self.cur.execute(f"SET LOCAL ivfflat.probes = {int(self.db_config.ivfflat_probes)};")
+            self.cur.execute(sql_query, (to_halfvec_literal(l2_normalize(query_vector)), limit))
+            rows = self.cur.fetchall()
+            
+            results = []
+            for i, row in enumerate(rows):
+                result = SearchResult(
+                    recipe_id=row[0],
+                    recipe_name=row[1],
+                    description=row[2],
+                    ingredients=row[3],
+                    vector_score=float(row[4]),
+                    search_stage="ベクトル検索",
+                    rank=i + 1
+                )
+                results.append(result)
+            
+            execution_time = time.time() - start_time
+            
+            stage = SearchStage(
+                stage_name="ベクトル検索",
+                candidates_in=-1,  # Whole table via vector index
+                candidates_out=len(results),
+                execution_time=execution_time,
+                sql_query=sql_query
+            )
+            
+            return results, stage
+            
+        except Error as e:
+            print(f"ベクトル検索エラー: {e}")
+            raise
+    
     def search_combined(self, condition: SearchCondition) -> Tuple[List[SearchResult], SearchStage]:
         """複合クエリ（一度の実行で両方のスコア取得）
         
@@ -233,11 +343,6 @@ class EdoRecipeHybridManager:
         sql_parts = []
         params = []
         
-        # Get query vector if needed
-        query_vector = None
-        if condition.vector_query_text:
-            query_vector = self.get_text_embedding(condition.vector_query_text)
-        
         # Build WHERE conditions
         where_conditions = []
         
@@ -291,11 +396,13 @@ class EdoRecipeHybridManager:
             self.cur.execute(sql_query, params)
             rows = self.cur.fetchall()
             
+            fulltext_weight = condition.fulltext_weight
+            vector_weight = condition.vector_weight
             results = []
             for i, row in enumerate(rows):
                 fulltext_score = float(row[4]) if row[4] else 0.0
                 vector_score = float(row[5]) if row[5] else 0.0
-                combined_score = fulltext_score * condition.fulltext_weight + vector_score * condition.vector_weight
+                combined_score = fulltext_score * fulltext_weight + vector_score * vector_weight
                 
                 result = SearchResult(
                     recipe_id=row[0],
@@ -342,7 +449,10 @@ class EdoRecipeHybridManager:
         Returns:
             埋め込みベクトル、失敗時はNone
         """
-        if not self.openai_client or not text.strip():
+        if not text.strip():
+            return None
+        if not self.openai_client:
+            self.embedding_failed = True
             return None
             
         try:
@@ -350,6 +460,7 @@ class EdoRecipeHybridManager:
             return embedding
         except Exception as e:
             print(f"埋め込み生成エラー: {e}")
+            self.embedding_failed = True
             return None
     
     def get_performance_metrics(self) -> PerformanceMetrics:
@@ -364,14 +475,17 @@ class EdoRecipeHybridManager:
         try:
             if self.cur:
                 self.cur.close()
+                self.cur = None
             if self.conn:
-                self.conn.close()
+                # Return the connection to the pool (open transaction is rolled back)
+                self.db_config.get_connection_pool().putconn(self.conn)
+                self.conn = None
             
             # Close existing managers
-            if hasattr(self.fulltext_manager, 'close'):
-                self.fulltext_manager.close()
-            if hasattr(self.vector_manager, 'close'):
-                self.vector_manager.close()
+            if self._fulltext_manager is not None:
+                self._fulltext_manager.close()
+            if self._vector_manager is not None:
+                self._vector_manager.close()
                 
             print("ハイブリッド検索マネージャーの接続を閉じました")
         except Error as e:
@@ -66,7 +66,7 @@ class EdoRecipeManager:
         # メインテーブル
         create_recipes_table_query = """
         CREATE TABLE IF NOT EXISTS edo_recipes (
-            id SMALLINT PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
             name VARCHAR(100) NOT NULL,
             url TEXT NOT NULL,
             description TEXT,
@@ -81,7 +81,7 @@ class EdoRecipeManager:
         create_ingredients_table_query = """
         CREATE TABLE IF NOT EXISTS recipe_ingredients (
             id SERIAL PRIMARY KEY,
-            recipe_id SMALLINT REFERENCES edo_recipes(id) ON DELETE CASCADE,
+            recipe_id INTEGER REFERENCES edo_recipes(id) ON DELETE CASCADE,
             ingredient TEXT NOT NULL,
             sort_order SMALLINT NOT NULL
         );
@@ -91,7 +91,7 @@ class EdoRecipeManager:
         create_instructions_table_query = """
         CREATE TABLE IF NOT EXISTS recipe_instructions (
             id SERIAL PRIMARY KEY,
-            recipe_id SMALLINT REFERENCES edo_recipes(id) ON DELETE CASCADE,
+            recipe_id INTEGER REFERENCES edo_recipes(id) ON DELETE CASCADE,
             instruction_type VARCHAR(20) NOT NULL,
             instruction TEXT NOT NULL,
             step_number SMALLINT NOT NULL
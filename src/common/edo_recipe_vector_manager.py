@@ -1,14 +1,87 @@
+import logging
+import math
 import psycopg2
 from psycopg2 import Error
 from psycopg2.extensions import connection
-from typing import Optional, List, Tuple, Dict, Any
+from psycopg2.extras import execute_values
+from typing import Optional, List, Tuple, Dict, Any, Iterator
 
 from .database_config import DatabaseConfig
 
+logger = logging.getLogger(__name__)
+
 
 class EdoRecipeVectorManager:
     """江戸料理レシピベクターデータの管理を担当するクラス（SRP準拠）"""
     
+    # 埋め込み用説明文テキストを edo_recipes の生成列として追加
+    # （Python側で取得のたびに連結せず、挿入・更新時に1度だけ計算する）
+    DESCRIPTION_TEXT_COLUMN_QUERY = """
+    ALTER TABLE edo_recipes ADD COLUMN IF NOT EXISTS description_text TEXT
+    GENERATED ALWAYS AS (
+        btrim(name || '。' || COALESCE(description, '') || '。' || COALESCE(tips, ''), E' \\t\\r\\n\\u3000')
+    ) STORED;
+    """
+    
+    # has_modern_data 維持用トリガー
+    # 部分インデックスの条件は索引対象テーブル自身の列である必要があるため、
+    # recipe_instructions の状態を edo_recipe_vectors の真偽値列に反映する
+    MODERN_DATA_TRIGGER_QUERIES = [
+        """
+        CREATE OR REPLACE FUNCTION edo_recipe_vectors_set_has_modern_data() RETURNS trigger AS $$
+        BEGIN
+            NEW.has_modern_data := EXISTS (
+                SELECT 1 FROM recipe_instructions
+                WHERE recipe_id = NEW.recipe_id AND instruction_type = 'modern'
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        CREATE OR REPLACE TRIGGER trg_recipe_vectors_has_modern_data
+        BEFORE INSERT OR UPDATE OF recipe_id ON edo_recipe_vectors
+        FOR EACH ROW EXECUTE FUNCTION edo_recipe_vectors_set_has_modern_data();
+        """,
+        """
+        CREATE OR REPLACE FUNCTION recipe_instructions_sync_has_modern_data() RETURNS trigger AS $$
+        DECLARE
+            target_recipe_id INTEGER;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                target_recipe_id := OLD.recipe_id;
+            ELSE
+                target_recipe_id := NEW.recipe_id;
+            END IF;
+            
+            UPDATE edo_recipe_vectors rv
+            SET has_modern_data = EXISTS (
+                SELECT 1 FROM recipe_instructions
+                WHERE recipe_id = target_recipe_id AND instruction_type = 'modern'
+            )
+            WHERE rv.recipe_id = target_recipe_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        CREATE OR REPLACE TRIGGER trg_recipe_instructions_has_modern_data
+        AFTER INSERT OR UPDATE OR DELETE ON recipe_instructions
+        FOR EACH ROW EXECUTE FUNCTION recipe_instructions_sync_has_modern_data();
+        """
+    ]
+    
+    # 検索補助用インデックス作成クエリ
+    # （ベクター類似性検索用インデックスは create_vector_indexes で作成）
+    SEARCH_SUPPORT_INDEX_QUERIES = [
+        "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_recipe_id ON edo_recipe_vectors(recipe_id);",
+        "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_combined_text_bigm ON edo_recipe_vectors USING gin (combined_text gin_bigm_ops);",
+        "CREATE INDEX IF NOT EXISTS idx_similarities_source ON recipe_similarities(source_recipe_id, combined_similarity DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_similarities_combined ON recipe_similarities(combined_similarity DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_search_logs_type ON vector_search_logs(search_type);",
+        "CREATE INDEX IF NOT EXISTS idx_search_logs_created ON vector_search_logs(created_at);"
+    ]
+    
     def __init__(self, db_config: DatabaseConfig):
         """EdoRecipeVectorManagerを初期化
         
@@ -18,6 +91,7 @@ class EdoRecipeVectorManager:
         self.db_config = db_config
         self.conn: Optional[connection] = None
         self.cur = None
+        self._insert_statements_prepared = False
         self._connect()
     
     def _connect(self) -> None:
@@ -25,9 +99,9 @@ class EdoRecipeVectorManager:
         try:
             self.conn = psycopg2.connect(**self.db_config.to_connection_params())
             self.cur = self.conn.cursor()
-            print(f"Connected to database: {self.db_config}")
+            logger.info("Connected to database: %s", self.db_config)
         except Error as e:
-            print(f"Error connecting to PostgreSQL: {e}")
+            logger.error("Error connecting to PostgreSQL: %s", e)
             raise
     
     def vector_tables_exist(self) -> bool:
@@ -39,20 +113,16 @@ class EdoRecipeVectorManager:
         try:
             tables = ['edo_recipe_vectors', 'recipe_similarities']
             
-            for table_name in tables:
-                self.cur.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_name = %s
-                    );
-                """, (table_name,))
-                
-                if not self.cur.fetchone()[0]:
-                    return False
+            # 1回のクエリで全テーブルの存在を確認
+            self.cur.execute("""
+                SELECT count(DISTINCT table_name)
+                FROM information_schema.tables 
+                WHERE table_name = ANY(%s);
+            """, (tables,))
             
-            return True
+            return self.cur.fetchone()[0] == len(tables)
         except Error as e:
-            print(f"Error checking vector table existence: {e}")
+            logger.error("Error checking vector table existence: %s", e)
             return False
     
     def create_vector_tables(self) -> bool:
@@ -68,7 +138,7 @@ class EdoRecipeVectorManager:
         create_vectors_table_query = """
         CREATE TABLE IF NOT EXISTS edo_recipe_vectors (
             id SERIAL PRIMARY KEY,
-            recipe_id SMALLINT REFERENCES edo_recipes(id) ON DELETE CASCADE,
+            recipe_id INTEGER REFERENCES edo_recipes(id) ON DELETE CASCADE,
             
             -- テキストデータ（埋め込み対象）
             description_text TEXT NOT NULL,
@@ -76,11 +146,14 @@ class EdoRecipeVectorManager:
             instructions_text TEXT NOT NULL,
             combined_text TEXT NOT NULL,
             
-            -- 埋め込みベクター（OpenAI text-embedding-3-small: 1536次元）
-            description_embedding vector(1536),
-            ingredients_embedding vector(1536),
-            instructions_embedding vector(1536),
-            combined_embedding vector(1536),
+            -- 埋め込みベクター（OpenAI text-embedding-3-small: 1536次元、halfvec=FP16で保持）
+            description_embedding halfvec(1536),
+            ingredients_embedding halfvec(1536),
+            instructions_embedding halfvec(1536),
+            combined_embedding halfvec(1536),
+            
+            -- 現代レシピ手順の有無（部分インデックス用、トリガーで維持）
+            has_modern_data BOOLEAN NOT NULL DEFAULT FALSE,
             
             -- メタデータ
             embedding_model VARCHAR(50) DEFAULT 'text-embedding-3-small',
@@ -89,15 +162,15 @@ class EdoRecipeVectorManager:
             
             -- 制約
             UNIQUE(recipe_id)
-        );
+        ) WITH (fillfactor = 90);  -- updated_at 更新時のHOT更新用に空き領域を確保
         """
         
         # 類似性テーブル
         create_similarities_table_query = """
         CREATE TABLE IF NOT EXISTS recipe_similarities (
             id SERIAL PRIMARY KEY,
-            source_recipe_id SMALLINT REFERENCES edo_recipes(id) ON DELETE CASCADE,
-            target_recipe_id SMALLINT REFERENCES edo_recipes(id) ON DELETE CASCADE,
+            source_recipe_id INTEGER REFERENCES edo_recipes(id) ON DELETE CASCADE,
+            target_recipe_id INTEGER REFERENCES edo_recipes(id) ON DELETE CASCADE,
             
             -- 類似度スコア
             description_similarity FLOAT NOT NULL,
@@ -140,44 +213,276 @@ class EdoRecipeVectorManager:
         );
         """
         
-        # ベクター類似性検索用インデックス作成クエリ（HNSW方式、コサイン類似度最適化）
-        create_vector_indexes_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_description_cosine ON edo_recipe_vectors USING hnsw (description_embedding vector_cosine_ops);",
-            "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_ingredients_cosine ON edo_recipe_vectors USING hnsw (ingredients_embedding vector_cosine_ops);",
-            "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_instructions_cosine ON edo_recipe_vectors USING hnsw (instructions_embedding vector_cosine_ops);",
-            "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_combined_cosine ON edo_recipe_vectors USING hnsw (combined_embedding vector_cosine_ops);",
-            "CREATE INDEX IF NOT EXISTS idx_recipe_vectors_recipe_id ON edo_recipe_vectors(recipe_id);",
-            "CREATE INDEX IF NOT EXISTS idx_similarities_source ON recipe_similarities(source_recipe_id, combined_similarity DESC);",
-            "CREATE INDEX IF NOT EXISTS idx_similarities_combined ON recipe_similarities(combined_similarity DESC);",
-            "CREATE INDEX IF NOT EXISTS idx_search_logs_type ON vector_search_logs(search_type);",
-            "CREATE INDEX IF NOT EXISTS idx_search_logs_created ON vector_search_logs(created_at);"
-        ]
-        
         try:
             # pg_vector拡張を有効化
             self.cur.execute(enable_vector_extension_query)
-            print("✓ pg_vector拡張を有効化しました")
+            logger.info("✓ pg_vector拡張を有効化しました")
             
             # テーブル作成
             self.cur.execute(create_vectors_table_query)
-            print("✓ edo_recipe_vectorsテーブルを作成しました")
+            logger.info("✓ edo_recipe_vectorsテーブルを作成しました")
             
             self.cur.execute(create_similarities_table_query)
-            print("✓ recipe_similaritiesテーブルを作成しました")
+            logger.info("✓ recipe_similaritiesテーブルを作成しました")
             
             self.cur.execute(create_search_logs_table_query)
-            print("✓ vector_search_logsテーブルを作成しました")
+            logger.info("✓ vector_search_logsテーブルを作成しました")
+            
+            self.cur.execute(self.DESCRIPTION_TEXT_COLUMN_QUERY)
+            logger.info("✓ edo_recipesに埋め込み用テキスト生成列を追加しました")
+            
+            # has_modern_data 維持用トリガー作成
+            for trigger_query in self.MODERN_DATA_TRIGGER_QUERIES:
+                self.cur.execute(trigger_query)
+            logger.info("✓ 現代レシピデータ判定用トリガーを作成しました")
+            
+            # 検索補助用インデックス作成
+            for index_query in self.SEARCH_SUPPORT_INDEX_QUERIES:
+                self.cur.execute(index_query)
             
             # ベクター検索用インデックス作成
-            for index_query in create_vector_indexes_queries:
+            # IVFFlatはデータ投入後でないとクラスタ中心が決まらないため、ここではHNSWのみ作成
+            if self.db_config.index_type == 'hnsw':
+                for index_query in self._vector_index_queries('hnsw'):
+                    self.cur.execute(index_query)
+                logger.info("✓ ベクター検索用インデックスを作成しました")
+            
+            self.conn.commit()
+            return True
+            
+        except Error as e:
+            logger.error("Error creating vector tables: %s", e)
+            self.conn.rollback()
+            return False
+    
+    # SMALLINTで作成されていた旧スキーマのレシピIDカラム（参照先のedo_recipes.idを先に変更）
+    RECIPE_ID_COLUMNS = (
+        ('edo_recipes', 'id'),
+        ('recipe_ingredients', 'recipe_id'),
+        ('recipe_instructions', 'recipe_id'),
+        ('edo_recipe_vectors', 'recipe_id'),
+        ('recipe_similarities', 'source_recipe_id'),
+        ('recipe_similarities', 'target_recipe_id')
+    )
+    
+    def migrate_vector_schema(self) -> bool:
+        """既存のベクターテーブルを現在のスキーマに移行
+        
+        create_vector_tables はテーブルが存在すると実行されないため、
+        旧スキーマで作成されたデータベースに対して以下を行う（いずれも冪等）。
+        
+        - SMALLINTのレシピIDカラムをINTEGERに変更
+        - has_modern_data 列の追加・値の補完と、維持用トリガーの作成
+        - edo_recipes への埋め込み用テキスト生成列（description_text）の追加
+        - vector(1536)の埋め込みカラムをhalfvec(1536)に変換しつつ正規化し、
+          halfvecでも正規化されていない行があれば正規化し直す
+          （内積（<#>）による検索は単位ベクトルでのみコサイン類似度と一致するため）
+        
+        埋め込みカラムの型変更または has_modern_data の追加を行った場合は、
+        ベクター検索用インデックスを作り直す。
+        
+        Returns:
+            移行成功時（移行不要の場合を含む）はTrue、失敗時はFalse
+        """
+        columns = [f"{column}_embedding" for column in ('description', 'ingredients', 'instructions', 'combined')]
+        
+        try:
+            # レシピIDカラムの型を統一（外部キーは型変更時に再検証される）
+            for table_name, column_name in self.RECIPE_ID_COLUMNS:
+                self.cur.execute("""
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = %s AND column_name = %s;
+                """, (table_name, column_name))
+                row = self.cur.fetchone()
+                if row and row[0] == 'smallint':
+                    self.cur.execute(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE INTEGER;")
+                    logger.info("✓ %s.%s をINTEGERに変更しました", table_name, column_name)
+            
+            # 部分インデックス用の has_modern_data 列
+            self.cur.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'edo_recipe_vectors' AND column_name = 'has_modern_data'
+                );
+            """)
+            has_modern_data_added = not self.cur.fetchone()[0]
+            if has_modern_data_added:
+                self.cur.execute("""
+                    ALTER TABLE edo_recipe_vectors
+                    ADD COLUMN IF NOT EXISTS has_modern_data BOOLEAN NOT NULL DEFAULT FALSE;
+                """)
+                self.cur.execute("""
+                    UPDATE edo_recipe_vectors rv
+                    SET has_modern_data = TRUE
+                    WHERE EXISTS (
+                        SELECT 1 FROM recipe_instructions ri
+                        WHERE ri.recipe_id = rv.recipe_id AND ri.instruction_type = 'modern'
+                    );
+                """)
+                logger.info("✓ edo_recipe_vectorsにhas_modern_data列を追加しました")
+            
+            for trigger_query in self.MODERN_DATA_TRIGGER_QUERIES:
+                self.cur.execute(trigger_query)
+            
+            self.cur.execute(self.DESCRIPTION_TEXT_COLUMN_QUERY)
+            
+            for index_query in self.SEARCH_SUPPORT_INDEX_QUERIES:
                 self.cur.execute(index_query)
-            print("✓ ベクター検索用インデックスを作成しました")
+            
+            # 埋め込みカラムの型
+            self.cur.execute("""
+                SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+                FROM pg_attribute a
+                WHERE a.attrelid = 'edo_recipe_vectors'::regclass
+                AND a.attname = ANY(%s) AND NOT a.attisdropped;
+            """, (columns,))
+            legacy_columns = [name for name, column_type in self.cur.fetchall() if column_type != 'halfvec(1536)']
+            
+            if legacy_columns:
+                # 旧演算子クラス（vector_cosine_opsなど）のインデックスは型変更できないため先に削除
+                self._drop_vector_indexes()
+                
+                alter_clauses = ", ".join(
+                    f"ALTER COLUMN {column} TYPE halfvec(1536) USING l2_normalize({column}::halfvec)"
+                    for column in legacy_columns
+                )
+                self.cur.execute(f"ALTER TABLE edo_recipe_vectors {alter_clauses};")
+                logger.info("✓ 埋め込みカラムをhalfvec(1536)に移行しました: %s", ", ".join(legacy_columns))
+            
+            # 正規化前に保存された埋め込みを単位ベクトルに揃える
+            normalized_rows = 0
+            for column in columns:
+                self.cur.execute(f"""
+                    UPDATE edo_recipe_vectors
+                    SET {column} = l2_normalize({column})
+                    WHERE abs(l2_norm({column}) - 1) > 0.001;
+                """)
+                normalized_rows += self.cur.rowcount
+            if normalized_rows:
+                logger.info("✓ 正規化されていない埋め込み %d 件を正規化しました", normalized_rows)
             
             self.conn.commit()
+            
+        except Error as e:
+            logger.error("Error migrating vector schema: %s", e)
+            self.conn.rollback()
+            return False
+        
+        if legacy_columns or has_modern_data_added:
+            return self.create_vector_indexes()
+        return True
+    
+    def _drop_vector_indexes(self, index_type: Optional[str] = None) -> None:
+        """edo_recipe_vectors のベクター検索用インデックスを削除
+        
+        Args:
+            index_type: 削除するインデックス種別 ('hnsw' または 'ivfflat')、省略時は両方
+        """
+        access_methods = [index_type] if index_type else ['hnsw', 'ivfflat']
+        self.cur.execute("""
+            SELECT ic.relname
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = ic.relam
+            WHERE i.indrelid = 'edo_recipe_vectors'::regclass
+            AND am.amname = ANY(%s);
+        """, (access_methods,))
+        for (index_name,) in self.cur.fetchall():
+            self.cur.execute(f'DROP INDEX IF EXISTS "{index_name}";')
+    
+    def _vector_index_queries(self, index_type: str, lists: int = 0) -> List[str]:
+        """ベクター類似性検索用インデックス作成クエリを生成
+        
+        Args:
+            index_type: インデックス種別 ('hnsw' または 'ivfflat')
+            lists: IVFFlatのリスト数（ivfflat時のみ使用）
+            
+        Returns:
+            CREATE INDEX クエリのリスト
+        """
+        columns = ('description', 'ingredients', 'instructions', 'combined')
+        
+        if index_type == 'ivfflat':
+            suffix = "ip_ivfflat"
+            legacy_suffix = "ivfflat"
+            with_clause = f" WITH (lists = {int(lists)})"
+        else:
+            suffix = "ip"
+            legacy_suffix = "cosine"
+            with_clause = " WITH (m = 16, ef_construction = 64)"
+        
+        # 埋め込みは単位ベクトルで保存するため、検索は内積（<#>）で行う
+        # 旧コサイン距離用インデックスは検索に使われなくなるため削除する
+        legacy_modern_index_name = "idx_recipe_vectors_combined_modern" if index_type == 'hnsw' else "idx_recipe_vectors_combined_modern_ivfflat"
+        queries = [
+            f"DROP INDEX IF EXISTS idx_recipe_vectors_{column}_{legacy_suffix};"
+            for column in columns
+        ]
+        queries.append(f"DROP INDEX IF EXISTS {legacy_modern_index_name};")
+        
+        queries.extend(
+            f"CREATE INDEX IF NOT EXISTS idx_recipe_vectors_{column}_{suffix} ON edo_recipe_vectors "
+            f"USING {index_type} ({column}_embedding halfvec_ip_ops){with_clause};"
+            for column in columns
+        )
+        
+        queries.append(
+            f"CREATE INDEX IF NOT EXISTS idx_recipe_vectors_combined_modern_{suffix} ON edo_recipe_vectors "
+            f"USING {index_type} (combined_embedding halfvec_ip_ops){with_clause} WHERE has_modern_data;"
+        )
+        
+        # 二値量子化（符号ビット）のハミング距離による候補絞り込み用
+        queries.append(
+            f"CREATE INDEX IF NOT EXISTS idx_recipe_vectors_combined_bit_{suffix} ON edo_recipe_vectors "
+            f"USING {index_type} ((binary_quantize(combined_embedding)::bit(1536)) bit_hamming_ops){with_clause};"
+        )
+        
+        return queries
+    
+    def create_vector_indexes(self, index_type: Optional[str] = None) -> bool:
+        """ベクター類似性検索用インデックスを作成
+        
+        IVFFlatはHNSWより高速に構築できるため、一括で再構築するデータ向け。
+        リスト数は pg_vector の推奨に従い、100万件までは件数/1000、それを超える場合は
+        件数の平方根とする（最小10）。IVFFlatのクラスタは作成時のデータで決まるため、
+        既存のIVFFlatインデックスは現在の件数で作り直す。
+        もう一方の種別のインデックスは検索に使われず更新コストだけがかかるため削除する。
+        
+        Args:
+            index_type: インデックス種別 ('hnsw' または 'ivfflat')、省略時は設定値
+            
+        Returns:
+            作成成功時はTrue、失敗時はFalse
+            
+        Raises:
+            ValueError: 未対応のインデックス種別が指定された場合
+        """
+        index_type = index_type or self.db_config.index_type
+        if index_type not in ('hnsw', 'ivfflat'):
+            raise ValueError(f"未対応のインデックス種別: {index_type}")
+        
+        try:
+            self._drop_vector_indexes('ivfflat' if index_type == 'hnsw' else 'hnsw')
+            
+            lists = 0
+            if index_type == 'ivfflat':
+                self.cur.execute("SELECT COUNT(*) FROM edo_recipe_vectors;")
+                recipe_count = self.cur.fetchone()[0]
+                if recipe_count <= 1_000_000:
+                    lists = max(10, recipe_count // 1000)
+                else:
+                    lists = int(math.sqrt(recipe_count))
+                self._drop_vector_indexes('ivfflat')
+            
+            for index_query in self._vector_index_queries(index_type, lists):
+                self.cur.execute(index_query)
+            
+            self.conn.commit()
+            logger.info("✓ ベクター検索用インデックスを作成しました (%s)", index_type)
             return True
             
         except Error as e:
-            print(f"Error creating vector tables: {e}")
+            logger.error("Error creating vector indexes: %s", e)
             self.conn.rollback()
             return False
     
@@ -192,18 +497,21 @@ class EdoRecipeVectorManager:
             drop_queries = [
                 "DROP TABLE IF EXISTS vector_search_logs CASCADE;",
                 "DROP TABLE IF EXISTS recipe_similarities CASCADE;",
-                "DROP TABLE IF EXISTS edo_recipe_vectors CASCADE;"
+                "DROP TABLE IF EXISTS edo_recipe_vectors CASCADE;",
+                "DROP FUNCTION IF EXISTS recipe_instructions_sync_has_modern_data() CASCADE;",
+                "DROP FUNCTION IF EXISTS edo_recipe_vectors_set_has_modern_data() CASCADE;",
+                "ALTER TABLE IF EXISTS edo_recipes DROP COLUMN IF EXISTS description_text;"
             ]
             
             for query in drop_queries:
                 self.cur.execute(query)
             
             self.conn.commit()
-            print("✓ ベクターテーブルを削除しました")
+            logger.info("✓ ベクターテーブルを削除しました")
             return True
             
         except Error as e:
-            print(f"Error dropping vector tables: {e}")
+            logger.error("Error dropping vector tables: %s", e)
             self.conn.rollback()
             return False
     
@@ -214,25 +522,40 @@ class EdoRecipeVectorManager:
             (recipe_id, recipe_name)のタプルリスト
         """
         try:
-            query = """
-            SELECT DISTINCT r.id, r.name 
-            FROM edo_recipes r
-            INNER JOIN recipe_instructions ri ON r.id = ri.recipe_id 
-            WHERE ri.instruction_type = 'modern'
-            AND EXISTS (
-                SELECT 1 FROM recipe_ingredients ing 
-                WHERE ing.recipe_id = r.id
-            )
-            ORDER BY r.id;
-            """
-            
-            self.cur.execute(query)
-            return self.cur.fetchall()
+            return list(self.get_recipes_with_modern_data_iter())
             
         except Error as e:
-            print(f"Error getting recipes with modern data: {e}")
+            logger.error("Error getting recipes with modern data: %s", e)
             return []
     
+    def get_recipes_with_modern_data_iter(self, itersize: int = 1000) -> Iterator[Tuple[int, str]]:
+        """現代レシピデータが存在するレシピをサーバーサイドカーソルで逐次取得
+        
+        結果全体をクライアント側に保持せず、itersize件ずつフェッチする。
+        
+        Args:
+            itersize: 1回のフェッチで取得する行数
+            
+        Yields:
+            (recipe_id, recipe_name)のタプル
+        """
+        query = """
+        SELECT DISTINCT r.id, r.name 
+        FROM edo_recipes r
+        INNER JOIN recipe_instructions ri ON r.id = ri.recipe_id 
+        WHERE ri.instruction_type = 'modern'
+        AND EXISTS (
+            SELECT 1 FROM recipe_ingredients ing 
+            WHERE ing.recipe_id = r.id
+        )
+        ORDER BY r.id;
+        """
+        
+        with self.conn.cursor(name='recipes_modern') as cur:
+            cur.itersize = itersize
+            cur.execute(query)
+            yield from cur
+    
     def get_recipe_text_data(self, recipe_id: int) -> Optional[Dict[str, Any]]:
         """指定レシピのテキストデータを取得して統合
         
@@ -243,48 +566,40 @@ class EdoRecipeVectorManager:
             統合されたテキストデータ辞書、失敗時はNone
         """
         try:
-            # レシピ基本情報取得
-            recipe_query = """
-            SELECT name, description, tips
-            FROM edo_recipes 
-            WHERE id = %s;
+            # レシピ基本情報・材料・現代手順を1回のクエリで取得し、SQL側でテキスト統合
+            # description_text は edo_recipes の生成列（挿入時に1度だけ計算）
+            text_query = """
+            SELECT
+                r.name,
+                r.description_text,
+                ing.ingredients_text,
+                ins.instructions_text,
+                rtrim(
+                    'レシピ名: ' || r.name || '。説明: ' || COALESCE(r.description, '') || '。'
+                    || ing.ingredients_text || '。' || ins.instructions_text || '。' || COALESCE(r.tips, ''),
+                    E' \\t\\r\\n\\u3000'
+                ) AS combined_text
+            FROM edo_recipes r
+            CROSS JOIN LATERAL (
+                SELECT '材料: ' || COALESCE(string_agg(ingredient, '、' ORDER BY sort_order), '') AS ingredients_text
+                FROM recipe_ingredients
+                WHERE recipe_id = r.id
+            ) ing
+            CROSS JOIN LATERAL (
+                SELECT '手順: ' || COALESCE(string_agg(instruction, '。' ORDER BY step_number), '') AS instructions_text
+                FROM recipe_instructions
+                WHERE recipe_id = r.id AND instruction_type = 'modern'
+            ) ins
+            WHERE r.id = %s;
             """
             
-            self.cur.execute(recipe_query, (recipe_id,))
-            recipe_info = self.cur.fetchone()
+            self.cur.execute(text_query, (recipe_id,))
+            row = self.cur.fetchone()
             
-            if not recipe_info:
+            if not row:
                 return None
             
-            name, description, tips = recipe_info
-            
-            # 材料データ取得
-            ingredients_query = """
-            SELECT ingredient
-            FROM recipe_ingredients 
-            WHERE recipe_id = %s
-            ORDER BY sort_order;
-            """
-            
-            self.cur.execute(ingredients_query, (recipe_id,))
-            ingredients = [row[0] for row in self.cur.fetchall()]
-            
-            # 現代手順データ取得
-            instructions_query = """
-            SELECT instruction
-            FROM recipe_instructions 
-            WHERE recipe_id = %s AND instruction_type = 'modern'
-            ORDER BY step_number;
-            """
-            
-            self.cur.execute(instructions_query, (recipe_id,))
-            instructions = [row[0] for row in self.cur.fetchall()]
-            
-            # テキスト統合
-            description_text = f"{name}。{description or ''}。{tips or ''}".strip()
-            ingredients_text = "材料: " + "、".join(ingredients)
-            instructions_text = "手順: " + "。".join(instructions)
-            combined_text = f"レシピ名: {name}。説明: {description or ''}。{ingredients_text}。{instructions_text}。{tips or ''}".strip()
+            name, description_text, ingredients_text, instructions_text, combined_text = row
             
             return {
                 "recipe_id": recipe_id,
@@ -296,9 +611,35 @@ class EdoRecipeVectorManager:
             }
             
         except Error as e:
-            print(f"Error getting recipe text data for ID {recipe_id}: {e}")
+            logger.error("Error getting recipe text data for ID %s: %s", recipe_id, e)
             return None
     
+    def _prepare_insert_statements(self) -> None:
+        """挿入処理用のプリペアドステートメントを準備（接続ごとに1回）
+        
+        テーブル作成前に接続する場合があるため、初回の挿入時に準備する。
+        以降の呼び出しではEXECUTEのみを送り、解析・実行計画の作成を省く。
+        """
+        if self._insert_statements_prepared:
+            return
+        
+        self.cur.execute("""
+            PREPARE insert_recipe_vectors AS
+            INSERT INTO edo_recipe_vectors (
+                recipe_id, description_text, ingredients_text, instructions_text, combined_text,
+                description_embedding, ingredients_embedding, instructions_embedding, combined_embedding,
+                embedding_model
+            ) VALUES (
+                $1, $2, $3, $4, $5,
+                l2_normalize($6::halfvec), l2_normalize($7::halfvec),
+                l2_normalize($8::halfvec), l2_normalize($9::halfvec),
+                $10
+            )
+            ON CONFLICT (recipe_id) DO NOTHING;
+        """)
+        
+        self._insert_statements_prepared = True
+    
     def insert_recipe_vectors(self, vector_data: Dict[str, Any]) -> bool:
         """レシピベクターデータを挿入
         
@@ -309,37 +650,74 @@ class EdoRecipeVectorManager:
             挿入成功時はTrue、失敗時はFalse
         """
         try:
-            # 既存チェック
-            self.cur.execute("""
-                SELECT EXISTS (SELECT 1 FROM edo_recipe_vectors WHERE recipe_id = %s);
-            """, (vector_data['recipe_id'],))
+            self._prepare_insert_statements()
             
-            if self.cur.fetchone()[0]:
-                print(f"レシピID {vector_data['recipe_id']} のベクターデータは既に存在します。スキップします。")
-                return True
-            
-            # ベクターデータ挿入
-            insert_query = """
-            INSERT INTO edo_recipe_vectors (
-                recipe_id, description_text, ingredients_text, instructions_text, combined_text,
-                description_embedding, ingredients_embedding, instructions_embedding, combined_embedding,
-                embedding_model
-            ) VALUES (
+            # ベクターデータ挿入（UNIQUE(recipe_id)により既存データはスキップ）
+            execute_query = """
+            EXECUTE insert_recipe_vectors (
                 %(recipe_id)s, %(description_text)s, %(ingredients_text)s, %(instructions_text)s, %(combined_text)s,
                 %(description_embedding)s, %(ingredients_embedding)s, %(instructions_embedding)s, %(combined_embedding)s,
                 %(embedding_model)s
             );
             """
             
-            self.cur.execute(insert_query, vector_data)
+            self.cur.execute(execute_query, vector_data)
             self.conn.commit()
+            
+            if self.cur.rowcount == 0:
+                logger.debug("レシピID %s のベクターデータは既に存在します。スキップします。", vector_data['recipe_id'])
             return True
             
         except Error as e:
-            print(f"Error inserting recipe vectors: {e}")
+            logger.error("Error inserting recipe vectors: %s", e)
             self.conn.rollback()
             return False
     
+    def insert_recipe_vectors_batch(self, vector_data_list: List[Dict[str, Any]], page_size: int = 100) -> int:
+        """レシピベクターデータを一括挿入
+        
+        複数行のVALUESを1つのINSERT文にまとめて送信し、レシピごとの
+        往復とコミットを省く。既存のrecipe_idはスキップする。
+        
+        Args:
+            vector_data_list: ベクターデータ辞書のリスト
+            page_size: 1文あたりの行数
+        
+        Returns:
+            新規に挿入した件数、失敗時は0
+        """
+        if not vector_data_list:
+            return 0
+        
+        try:
+            insert_query = """
+            INSERT INTO edo_recipe_vectors (
+                recipe_id, description_text, ingredients_text, instructions_text, combined_text,
+                description_embedding, ingredients_embedding, instructions_embedding, combined_embedding,
+                embedding_model
+            ) VALUES %s
+            ON CONFLICT (recipe_id) DO NOTHING
+            RETURNING recipe_id;
+            """
+            
+            # 内積検索のため埋め込みは単位ベクトルに正規化して保存
+            template = """(
+                %(recipe_id)s, %(description_text)s, %(ingredients_text)s, %(instructions_text)s, %(combined_text)s,
+                l2_normalize(%(description_embedding)s::halfvec), l2_normalize(%(ingredients_embedding)s::halfvec),
+                l2_normalize(%(instructions_embedding)s::halfvec), l2_normalize(%(combined_embedding)s::halfvec),
+                %(embedding_model)s
+            )"""
+            
+            inserted = execute_values(self.cur, insert_query, vector_data_list,
+                                      template=template, page_size=page_size, fetch=True)
+            self.conn.commit()
+            return len(inserted)
+        
+        except Error as e:
+            logger.error("Error inserting recipe vectors batch: %s", e)
+            self.conn.rollback()
+            return 0
+    
     def get_total_vector_recipes_count(self) -> int:
         """ベクター化済みレシピ総数を取得
         
@@ -350,7 +728,7 @@ class EdoRecipeVectorManager:
             self.cur.execute("SELECT COUNT(*) FROM edo_recipe_vectors;")
             return self.cur.fetchone()[0]
         except Error as e:
-            print(f"Error getting vector recipe count: {e}")
+            logger.error("Error getting vector recipe count: %s", e)
             return 0
     
     def close(self) -> None:
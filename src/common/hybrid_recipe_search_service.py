@@ -2,10 +2,17 @@
 HybridRecipeSearchService for high-level search operations.
 Implements business logic for hybrid search combining pg_bigm and pg_vector.
 """
+import re
 import time
 import asyncio
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 import statistics
+from dataclasses import replace
+from operator import itemgetter
 
 from .database_config import DatabaseConfig
 from .edo_recipe_hybrid_manager import EdoRecipeHybridManager
@@ -15,6 +22,50 @@ from .search_models import (
 )
 
 
+# Keyword vocabularies for query analysis (order defines suggestion order)
+_INGREDIENT_KEYWORDS = ("だし", "魚", "肉", "野菜", "豆腐", "油", "砂糖")
+_COOKING_KEYWORDS = ("煮る", "焼く", "蒸す", "揚げる")
+_ANALYSIS_KEYWORDS = _INGREDIENT_KEYWORDS + _COOKING_KEYWORDS
+_NEGATIVE_INDICATORS = ("含まない", "使わない", "入っていない", "ない", "除く")
+
+# Single-pass matchers for the vocabularies above (no keyword contains another)
+_ANALYSIS_KEYWORD_PATTERN = re.compile('|'.join(map(re.escape, _ANALYSIS_KEYWORDS)))
+_NEGATIVE_INDICATOR_PATTERN = re.compile('|'.join(map(re.escape, _NEGATIVE_INDICATORS)))
+
+# Common ingredients/terms for keyword suggestion
+_SUGGESTION_KEYWORDS = (
+    "だし", "醤油", "味噌", "砂糖", "塩", "酢", "油",
+    "魚", "肉", "野菜", "豆腐", "米", "麺",
+    "煮る", "焼く", "蒸す", "揚げる", "炒める",
+    "春", "夏", "秋", "冬", "季節"
+)
+_SUGGESTION_LIMIT = 10
+_SUGGESTION_DEFAULTS = _SUGGESTION_KEYWORDS[:_SUGGESTION_LIMIT]
+
+
+def _build_substring_index(keywords: Tuple[str, ...], limit: int) -> Dict[str, Tuple[str, ...]]:
+    """キーワードの全部分文字列から候補キーワードへの索引を構築
+    
+    Args:
+        keywords: キーワード（優先順）
+        limit: 部分文字列ごとの最大候補数
+        
+    Returns:
+        部分文字列 -> 候補キーワードのタプルの辞書
+    """
+    index: Dict[str, List[str]] = {}
+    for keyword in keywords:
+        substrings = {keyword[i:j] for i in range(len(keyword)) for j in range(i + 1, len(keyword) + 1)}
+        for substring in substrings:
+            matches = index.setdefault(substring, [])
+            if len(matches) < limit:
+                matches.append(keyword)
+    return {substring: tuple(matches) for substring, matches in index.items()}
+
+
+_SUGGESTION_INDEX = _build_substring_index(_SUGGESTION_KEYWORDS, _SUGGESTION_LIMIT)
+
+
 class ScoreCalculator:
     """スコア計算とランキング処理を担当するクラス"""
     
@@ -35,20 +86,23 @@ class ScoreCalculator:
         # Normalize scores to 0-1 range
         normalized_results = ScoreCalculator.normalize_scores(results)
         
-        # Calculate combined scores
-        for result in normalized_results:
-            result.combined_score = (
-                result.fulltext_score * condition.fulltext_weight +
-                result.vector_score * condition.vector_weight
-            )
-        
-        # Sort by combined score and update rankings
-        sorted_results = sorted(normalized_results, key=lambda r: r.combined_score, reverse=True)
+        # Select top-k by combined score without sorting the whole list
+        fulltext_weight = condition.fulltext_weight
+        vector_weight = condition.vector_weight
+        scored_results = [
+            (r.fulltext_score * fulltext_weight + r.vector_score * vector_weight, r)
+            for r in normalized_results
+        ]
+        top_scored = heapq.nlargest(condition.max_results, scored_results, key=itemgetter(0))
         
-        for i, result in enumerate(sorted_results):
+        # Assign combined scores and rankings to survivors only
+        top_results = []
+        for i, (combined_score, result) in enumerate(top_scored):
+            result.combined_score = combined_score
             result.rank = i + 1
+            top_results.append(result)
         
-        return sorted_results[:condition.max_results]
+        return top_results
     
     @staticmethod
     def normalize_scores(results: List[SearchResult]) -> List[SearchResult]:
@@ -63,93 +117,152 @@ class ScoreCalculator:
         if not results:
             return results
         
-        # Extract scores
+        # Extract positive scores once and derive min-max range per score type
         fulltext_scores = [r.fulltext_score for r in results if r.fulltext_score > 0]
         vector_scores = [r.vector_score for r in results if r.vector_score > 0]
         
-        # Calculate normalization parameters
-        fulltext_min = min(fulltext_scores) if fulltext_scores else 0
-        fulltext_max = max(fulltext_scores) if fulltext_scores else 1
-        vector_min = min(vector_scores) if vector_scores else 0
-        vector_max = max(vector_scores) if vector_scores else 1
+        # Normalization is skipped (None) when there is no positive score or no spread
+        fulltext_range = ScoreCalculator._min_max_range(fulltext_scores)
+        vector_range = ScoreCalculator._min_max_range(vector_scores)
+        if fulltext_range is None and vector_range is None:
+            return results
         
-        # Normalize scores
+        # Normalize scores in a single pass
         for result in results:
-            # Normalize fulltext score
-            if fulltext_max > fulltext_min and result.fulltext_score > 0:
-                result.fulltext_score = (result.fulltext_score - fulltext_min) / (fulltext_max - fulltext_min)
-            
-            # Normalize vector score
-            if vector_max > vector_min and result.vector_score > 0:
-                result.vector_score = (result.vector_score - vector_min) / (vector_max - vector_min)
+            if fulltext_range and result.fulltext_score > 0:
+                result.fulltext_score = (result.fulltext_score - fulltext_range[0]) * fulltext_range[1]
+            if vector_range and result.vector_score > 0:
+                result.vector_score = (result.vector_score - vector_range[0]) * vector_range[1]
         
         return results
     
     @staticmethod
-    def merge_and_score(fulltext_results: List[SearchResult], 
-                       vector_results: List[SearchResult], 
-                       condition: SearchCondition) -> List[SearchResult]:
-        """並列検索結果のマージとスコア計算
+    def _min_max_range(scores: List[float]) -> Optional[Tuple[float, float]]:
+        """Min-Max正規化のパラメータを計算
         
         Args:
-            fulltext_results: 全文検索結果
-            vector_results: ベクトル検索結果
-            condition: 検索条件
+            scores: 正のスコアリスト
             
         Returns:
-            マージされた結果リスト
+            (最小値, 1/(最大値-最小値))、正規化不要な場合はNone
         """
-        # Create recipe_id -> result mapping
-        fulltext_map = {r.recipe_id: r for r in fulltext_results}
-        vector_map = {r.recipe_id: r for r in vector_results}
-        
-        # Get all unique recipe IDs
-        all_recipe_ids = set(fulltext_map.keys()) | set(vector_map.keys())
-        
-        # Merge results
-        merged_results = []
-        for recipe_id in all_recipe_ids:
-            fulltext_result = fulltext_map.get(recipe_id)
-            vector_result = vector_map.get(recipe_id)
-            
-            # Create merged result
-            if fulltext_result and vector_result:
-                # Both results exist - merge
-                merged_result = SearchResult(
-                    recipe_id=recipe_id,
-                    recipe_name=fulltext_result.recipe_name or vector_result.recipe_name,
-                    description=fulltext_result.description or vector_result.description,
-                    ingredients=fulltext_result.ingredients or vector_result.ingredients,
-                    fulltext_score=fulltext_result.fulltext_score,
-                    vector_score=vector_result.vector_score,
-                    matched_keywords=fulltext_result.matched_keywords,
-                    search_stage="並列マージ"
-                )
-            elif fulltext_result:
-                # Only fulltext result
-                merged_result = fulltext_result
-                merged_result.search_stage = "全文検索のみ"
-            else:
-                # Only vector result
-                merged_result = vector_result
-                merged_result.search_stage = "ベクトル検索のみ"
-            
-            merged_results.append(merged_result)
-        
-        return ScoreCalculator.calculate_final_scores(merged_results, condition)
+        if not scores:
+            return None
+        low, high = min(scores), max(scores)
+        if high <= low:
+            return None
+        return low, 1.0 / (high - low)
 
 
 class HybridRecipeSearchService:
     """ハイブリッド検索の高レベル操作を提供するサービスクラス"""
     
-    def __init__(self, db_config: DatabaseConfig):
+    def __init__(self, db_config: DatabaseConfig, cache_size: int = 256, cache_ttl: float = 300.0):
         """HybridRecipeSearchServiceを初期化
         
         Args:
             db_config: データベース設定
+            cache_size: 検索結果キャッシュの最大件数（0でキャッシュ無効）
+            cache_ttl: 検索結果キャッシュの有効期間（秒）
         """
         self.db_config = db_config
         self.score_calculator = ScoreCalculator()
+        
+        # LRU cache of search responses keyed by normalized search condition
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._response_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Worker threads for overlapping query embedding with DB work (shared by all searches)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+        
+        # OpenAI client for query embeddings generated outside a manager (no DB connection needed)
+        self._openai_client = EdoRecipeHybridManager.create_openai_client()
+    
+    def close(self) -> None:
+        """サービスが所有するワーカースレッドを停止"""
+        self._executor.shutdown(wait=True)
+    
+    @staticmethod
+    def _cache_key(condition: SearchCondition) -> tuple:
+        """検索条件からキャッシュキーを生成
+        
+        Args:
+            condition: 検索条件
+            
+        Returns:
+            正規化された検索条件のタプル
+        """
+        return (
+            condition.search_mode,
+            tuple(sorted(condition.required_keywords)),
+            round(condition.required_similarity_threshold, 4),
+            tuple(sorted(condition.excluded_keywords)),
+            round(condition.excluded_similarity_threshold, 4),
+            condition.vector_query_text.strip(),
+            round(condition.vector_similarity_threshold, 4),
+            round(condition.fulltext_weight, 4),
+            round(condition.vector_weight, 4),
+            condition.max_results
+        )
+    
+    @staticmethod
+    def _copy_results(results: List[SearchResult]) -> List[SearchResult]:
+        """キャッシュと呼び出し元で結果オブジェクトを共有しないようにコピー
+        
+        Args:
+            results: 検索結果リスト
+            
+        Returns:
+            要素（リスト型のフィールドを含む）をコピーした検索結果リスト
+        """
+        return [
+            replace(r, matched_keywords=list(r.matched_keywords), excluded_keywords=list(r.excluded_keywords))
+            for r in results
+        ]
+    
+    def _get_cached_response(self, key: tuple) -> Optional[SearchResponse]:
+        """キャッシュから検索レスポンスを取得
+        
+        Args:
+            key: キャッシュキー
+            
+        Returns:
+            有効なキャッシュがあれば検索レスポンス、なければNone
+        """
+        with self._cache_lock:
+            entry = self._response_cache.get(key)
+            if entry is None:
+                return None
+            
+            cached_at, response = entry
+            if time.time() - cached_at > self.cache_ttl:
+                del self._response_cache[key]
+                return None
+            
+            self._response_cache.move_to_end(key)
+            return response
+    
+    def _store_cached_response(self, key: tuple, response: SearchResponse) -> None:
+        """検索レスポンスをキャッシュに保存
+        
+        Args:
+            key: キャッシュキー
+            response: 検索レスポンス
+        """
+        # Store a private copy so later mutation of the returned response cannot leak in
+        response = replace(response, results=self._copy_results(response.results))
+        with self._cache_lock:
+            self._response_cache[key] = (time.time(), response)
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.cache_size:
+                self._response_cache.popitem(last=False)
+    
+    def clear_cache(self) -> None:
+        """検索結果キャッシュをクリア"""
+        with self._cache_lock:
+            self._response_cache.clear()
     
     def search_recipes(self, condition: SearchCondition) -> SearchResponse:
         """メイン検索API - 全ての検索モードに対応
@@ -162,26 +275,83 @@ class HybridRecipeSearchService:
         """
         start_time = time.time()
         
+        # Serve repeated searches from the cache
+        cache_key = self._cache_key(condition) if self.cache_size > 0 else None
+        if cache_key is not None:
+            cached_response = self._get_cached_response(cache_key)
+            if cached_response is not None:
+                return replace(
+                    cached_response,
+                    results=self._copy_results(cached_response.results),
+                    execution_time=time.time() - start_time,
+                    search_condition=condition
+                )
+        
+        response, complete = self._run_search_mode(condition, start_time)
+        
+        # Do not keep responses degraded by a failed query embedding
+        if cache_key is not None and complete:
+            self._store_cached_response(cache_key, response)
+        
+        return response
+    
+    def _run_search_mode(self, condition: SearchCondition, start_time: Optional[float] = None,
+                         query_vector: Optional[List[float]] = None) -> Tuple[SearchResponse, bool]:
+        """検索モードに応じた検索を専用のDB接続で実行
+        
+        Args:
+            condition: 検索条件
+            start_time: 開始時刻（省略時は呼び出し時刻）
+            query_vector: 事前に計算済みのクエリ埋め込み（省略時は必要に応じて生成）
+            
+        Returns:
+            (検索レスポンス, クエリ埋め込みの生成に失敗せず完全な結果が得られたか)
+        """
+        if start_time is None:
+            start_time = time.time()
+        
         with EdoRecipeHybridManager(self.db_config) as manager:
             if condition.search_mode == SearchMode.CASCADE:
-                return self._cascade_search(manager, condition, start_time)
+                response = self._cascade_search(manager, condition, start_time, query_vector=query_vector)
             elif condition.search_mode == SearchMode.PARALLEL:
-                return self._parallel_search(manager, condition, start_time)
+                response = self._parallel_search(manager, condition, start_time)
             elif condition.search_mode == SearchMode.FULLTEXT_ONLY:
-                return self._fulltext_only_search(manager, condition, start_time)
+                response = self._fulltext_only_search(manager, condition, start_time)
             elif condition.search_mode == SearchMode.VECTOR_ONLY:
-                return self._vector_only_search(manager, condition, start_time)
+                response = self._vector_only_search(manager, condition, start_time, query_vector=query_vector)
             else:
                 raise ValueError(f"未対応の検索モード: {condition.search_mode}")
+            
+            return response, not manager.embedding_failed
+    
+    def _get_query_embedding(self, text: str) -> Optional[List[float]]:
+        """クエリ埋め込みを生成（OpenAI API）
+        
+        Args:
+            text: 埋め込み対象のテキスト
+            
+        Returns:
+            埋め込みベクトル、失敗時はNone
+        """
+        if not self._openai_client or not text.strip():
+            return None
+        
+        try:
+            return self._openai_client.get_single_embedding(text)
+        except Exception as e:
+            print(f"埋め込み生成エラー: {e}")
+            return None
     
     def _cascade_search(self, manager: EdoRecipeHybridManager, 
-                       condition: SearchCondition, start_time: float) -> SearchResponse:
+                       condition: SearchCondition, start_time: float,
+                       query_vector: Optional[List[float]] = None) -> SearchResponse:
         """段階的検索実装
         
         Args:
             manager: ハイブリッドマネージャー
             condition: 検索条件
             start_time: 開始時刻
+            query_vector: 事前に計算済みのクエリ埋め込み（省略時はここで生成）
             
         Returns:
             検索レスポンス
@@ -189,7 +359,14 @@ class HybridRecipeSearchService:
         stages = []
         
         # Stage 1: pg_bigmで候補絞り込み
+        # クエリ埋め込みの生成（OpenAI API）は候補絞り込みと独立しているため並行して実行
+        embedding_future = None
+        if condition.vector_query_text and query_vector is None:
+            embedding_future = self._executor.submit(manager.get_text_embedding, condition.vector_query_text)
+        
         candidate_ids, stage1 = manager.filter_by_fulltext(condition)
+        if embedding_future:
+            query_vector = embedding_future.result()
         stages.append(stage1)
         
         if not candidate_ids:
@@ -205,7 +382,9 @@ class HybridRecipeSearchService:
         
         # Stage 2: ベクトル類似度で並び替え
         if condition.vector_query_text:
-            results, stage2 = manager.rank_by_vector_similarity(candidate_ids, condition.vector_query_text)
+            results, stage2 = manager.rank_by_vector_similarity(
+                candidate_ids, condition.vector_query_text, query_vector=query_vector
+            )
             stages.append(stage2)
         else:
             # Vector search not requested, get basic info
@@ -266,15 +445,11 @@ class HybridRecipeSearchService:
             検索レスポンス
         """
         # Modify condition to disable vector search
-        modified_condition = SearchCondition(
-            required_keywords=condition.required_keywords,
-            excluded_keywords=condition.excluded_keywords,
-            required_similarity_threshold=condition.required_similarity_threshold,
-            excluded_similarity_threshold=condition.excluded_similarity_threshold,
+        modified_condition = replace(
+            condition,
             vector_query_text="",  # Disable vector search
             fulltext_weight=1.0,
             vector_weight=0.0,
-            max_results=condition.max_results,
             search_mode=SearchMode.FULLTEXT_ONLY
         )
         
@@ -292,13 +467,15 @@ class HybridRecipeSearchService:
         )
     
     def _vector_only_search(self, manager: EdoRecipeHybridManager, 
-                           condition: SearchCondition, start_time: float) -> SearchResponse:
+                           condition: SearchCondition, start_time: float,
+                           query_vector: Optional[List[float]] = None) -> SearchResponse:
         """ベクトル検索のみの実装
         
         Args:
             manager: ハイブリッドマネージャー
             condition: 検索条件
             start_time: 開始時刻
+            query_vector: 事前に計算済みのクエリ埋め込み（省略時はここで生成）
             
         Returns:
             検索レスポンス
@@ -313,17 +490,15 @@ class HybridRecipeSearchService:
                 search_condition=condition
             )
         
-        # Get all recipe IDs for vector search
-        all_ids, _ = manager.filter_by_fulltext(SearchCondition())  # No filters
-        results, stage = manager.rank_by_vector_similarity(all_ids, condition.vector_query_text)
-        
-        # Limit results
-        limited_results = results[:condition.max_results]
+        # Top-k over the whole table using the vector index
+        results, stage = manager.rank_by_vector_similarity_all(
+            condition.vector_query_text, condition.max_results, query_vector=query_vector
+        )
         
         execution_time = time.time() - start_time
         
         return SearchResponse(
-            results=limited_results,
+            results=results,
             total_matches=len(results),
             execution_time=execution_time,
             search_stages=[stage],
@@ -344,20 +519,19 @@ class HybridRecipeSearchService:
         if not recipe_ids:
             return []
         
+        # Join against the id array to keep the caller's candidate order
         sql_query = """
-        SELECT recipe_id, recipe_name, description, ingredients
-        FROM edo_recipes
-        WHERE recipe_id = ANY(%s)
-        ORDER BY recipe_id
+        SELECT r.id, r.name, r.description, '' as ingredients
+        FROM unnest(%s::int[]) WITH ORDINALITY AS t(id, ord)
+        JOIN edo_recipes r ON r.id = t.id
+        ORDER BY t.ord
         """
         
         try:
             manager.cur.execute(sql_query, (recipe_ids,))
-            rows = manager.cur.fetchall()
             
-            results = []
-            for i, row in enumerate(rows):
-                result = SearchResult(
+            return [
+                SearchResult(
                     recipe_id=row[0],
                     recipe_name=row[1],
                     description=row[2],
@@ -367,9 +541,8 @@ class HybridRecipeSearchService:
                     search_stage="基本情報",
                     rank=i + 1
                 )
-                results.append(result)
-            
-            return results
+                for i, row in enumerate(manager.cur.fetchall())
+            ]
             
         except Exception as e:
             print(f"基本情報取得エラー: {e}")
@@ -383,22 +556,44 @@ class HybridRecipeSearchService:
             
         Returns:
             性能比較結果
+            
+        Raises:
+            RuntimeError: 実行中のイベントループから呼び出された場合（acompare_search_modesを使用すること）
         """
-        # Test each search mode
-        cascade_response = self.search_recipes(
-            SearchCondition(**{**condition.__dict__, 'search_mode': SearchMode.CASCADE})
-        )
-        
-        parallel_response = self.search_recipes(
-            SearchCondition(**{**condition.__dict__, 'search_mode': SearchMode.PARALLEL})
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.acompare_search_modes(condition))
+        raise RuntimeError(
+            "compare_search_modes() cannot be called from a running event loop; "
+            "use 'await acompare_search_modes(condition)' instead"
         )
+    
+    async def acompare_search_modes(self, condition: SearchCondition) -> PerformanceComparison:
+        """異なる検索モードの性能比較（非同期版）
         
-        fulltext_response = self.search_recipes(
-            SearchCondition(**{**condition.__dict__, 'search_mode': SearchMode.FULLTEXT_ONLY})
-        )
+        クエリ埋め込み（OpenAI API）は最初に1回だけ生成して全モードで共有し、
+        4つの検索モードをそれぞれ専用の接続で同時に実行する。
+        各モードの実行時間は埋め込み生成を含まない同じ条件で計測される。
         
-        vector_response = self.search_recipes(
-            SearchCondition(**{**condition.__dict__, 'search_mode': SearchMode.VECTOR_ONLY})
+        Args:
+            condition: 基準となる検索条件
+            
+        Returns:
+            性能比較結果
+        """
+        # Shared query embedding for all modes
+        query_vector = None
+        if condition.vector_query_text:
+            query_vector = await asyncio.to_thread(self._get_query_embedding, condition.vector_query_text)
+        
+        # Test each search mode concurrently (each times itself from its own start)
+        mode_results = await asyncio.gather(*(
+            asyncio.to_thread(self._run_search_mode, replace(condition, search_mode=mode), None, query_vector)
+            for mode in (SearchMode.CASCADE, SearchMode.PARALLEL, SearchMode.FULLTEXT_ONLY, SearchMode.VECTOR_ONLY)
+        ))
+        cascade_response, parallel_response, fulltext_response, vector_response = (
+            response for response, _ in mode_results
         )
         
         # Determine recommendation
@@ -446,21 +641,11 @@ class HybridRecipeSearchService:
         Returns:
             キーワード候補リスト
         """
-        # Simple keyword suggestion based on common ingredients/terms
-        common_keywords = [
-            "だし", "醤油", "味噌", "砂糖", "塩", "酢", "油",
-            "魚", "肉", "野菜", "豆腐", "米", "麺",
-            "煮る", "焼く", "蒸す", "揚げる", "炒める",
-            "春", "夏", "秋", "冬", "季節"
-        ]
-        
         if not partial_text:
-            return common_keywords[:10]
-        
-        # Filter keywords that contain the partial text
-        matching_keywords = [kw for kw in common_keywords if partial_text in kw]
+            return list(_SUGGESTION_DEFAULTS)
         
-        return matching_keywords[:10] if matching_keywords else common_keywords[:10]
+        # Look up keywords that contain the partial text in the prebuilt index
+        return list(_SUGGESTION_INDEX.get(partial_text, _SUGGESTION_DEFAULTS))
     
     def analyze_query(self, query_text: str) -> QueryAnalysis:
         """クエリ解析 - 自動的な条件抽出
@@ -471,25 +656,17 @@ class HybridRecipeSearchService:
         Returns:
             クエリ解析結果
         """
-        # Simple keyword extraction logic
-        positive_indicators = ["含む", "使う", "入っている", "ある"]
-        negative_indicators = ["含まない", "使わない", "入っていない", "ない", "除く"]
-        
-        suggested_required = []
-        suggested_excluded = []
+        # Negation context applies to the whole query, so evaluate it once
+        context_negative = _NEGATIVE_INDICATOR_PATTERN.search(query_text) is not None
         
         # Basic keyword extraction (this could be enhanced with NLP)
-        ingredient_keywords = ["だし", "魚", "肉", "野菜", "豆腐", "油", "砂糖"]
-        cooking_keywords = ["煮る", "焼く", "蒸す", "揚げる"]
-        
-        for keyword in ingredient_keywords + cooking_keywords:
-            if keyword in query_text:
-                # Check context
-                context_negative = any(neg in query_text for neg in negative_indicators)
-                if context_negative:
-                    suggested_excluded.append(keyword)
-                else:
-                    suggested_required.append(keyword)
+        hits = set(_ANALYSIS_KEYWORD_PATTERN.findall(query_text))
+        matched_keywords = [kw for kw in _ANALYSIS_KEYWORDS if kw in hits]
+        
+        if context_negative:
+            suggested_required, suggested_excluded = [], matched_keywords
+        else:
+            suggested_required, suggested_excluded = matched_keywords, []
         
         # Simple complexity assessment
         complexity = "simple"
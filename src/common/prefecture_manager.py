@@ -1,6 +1,7 @@
 import psycopg2
 from psycopg2 import Error
 from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
 from typing import Optional, List, Tuple, Dict
 
 from .database_config import DatabaseConfig
@@ -133,16 +134,18 @@ class PrefectureManager:
             id, name, name_kana, capital, largest_city, region,
             population, area, population_density, municipalities_count,
             lower_house_seats, upper_house_seats
-        ) VALUES (
+        ) VALUES %s;
+        """
+        
+        template = """(
             %(id)s, %(name)s, %(name_kana)s, %(capital)s, %(largest_city)s, %(region)s,
             %(population)s, %(area)s, %(population_density)s, %(municipalities_count)s,
             %(lower_house_seats)s, %(upper_house_seats)s
-        );
-        """
+        )"""
         
         try:
-            # バッチ挿入の実行
-            self.cur.executemany(insert_query, data_list)
+            # 複数行VALUESによる一括挿入の実行
+            execute_values(self.cur, insert_query, data_list, template=template)
             self.conn.commit()
             print(f"✓ {len(data_list)}件のデータを挿入しました")
             return True
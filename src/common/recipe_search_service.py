@@ -1,4 +1,4 @@
-import psycopg2
+import weakref
 from psycopg2 import Error
 from psycopg2.extensions import connection
 from typing import Optional, List, Tuple, Dict
@@ -6,8 +6,64 @@ from typing import Optional, List, Tuple, Dict
 from .database_config import DatabaseConfig
 
 
+# 検索用プリペアドステートメント（名前 -> PREPARE文）
+_SEARCH_STATEMENTS = {
+    'search_by_ingredient_stmt': """
+        PREPARE search_by_ingredient_stmt (text, text, int) AS
+        SELECT DISTINCT r.id, r.name, array_agg(ri.ingredient ORDER BY ri.sort_order) as ingredients,
+               MAX(bigm_similarity(ri.ingredient, $1)) as max_similarity
+        FROM edo_recipes r
+        JOIN recipe_ingredients ri ON r.id = ri.recipe_id
+        WHERE ri.ingredient LIKE $2
+        GROUP BY r.id, r.name
+        ORDER BY max_similarity DESC, r.name
+        LIMIT $3;
+    """,
+    'search_by_fulltext_stmt': """
+        PREPARE search_by_fulltext_stmt (text, text, int) AS
+        SELECT r.id, r.name, r.description,
+               GREATEST(
+                   bigm_similarity(r.name, $1),
+                   bigm_similarity(COALESCE(r.description, ''), $1)
+               ) as similarity_score
+        FROM edo_recipes r
+        WHERE (r.name LIKE $2 OR COALESCE(r.description, '') LIKE $2)
+        ORDER BY similarity_score DESC, r.name
+        LIMIT $3;
+    """,
+    'search_combined_stmt': """
+        PREPARE search_combined_stmt (text, text, text, text, int) AS
+        SELECT DISTINCT r.id, r.name, r.description, 
+               array_agg(ri.ingredient ORDER BY ri.sort_order) as ingredients,
+               GREATEST(
+                   bigm_similarity(r.name, $1),
+                   bigm_similarity(COALESCE(r.description, ''), $1)
+               ) as recipe_similarity,
+               MAX(bigm_similarity(ri.ingredient, $2)) as ingredient_similarity,
+               (GREATEST(
+                   bigm_similarity(r.name, $1),
+                   bigm_similarity(COALESCE(r.description, ''), $1)
+               ) + MAX(bigm_similarity(ri.ingredient, $2))) as total_score
+        FROM edo_recipes r
+        JOIN recipe_ingredients ri ON r.id = ri.recipe_id
+        WHERE (r.name LIKE $3 OR COALESCE(r.description, '') LIKE $3)
+          AND ri.ingredient LIKE $4
+        GROUP BY r.id, r.name, r.description
+        ORDER BY total_score DESC, r.name
+        LIMIT $5;
+    """
+}
+
+# 検索用ステートメントを準備済みの接続（プール返却後も準備状態はセッションに残る）
+_prepared_connections = weakref.WeakSet()
+
+
 class RecipeSearchService:
-    """江戸料理レシピ検索機能を担当するクラス（SRP準拠）"""
+    """江戸料理レシピ検索機能を担当するクラス（SRP準拠）
+    
+    接続はコネクションプールから取得するため、``with RecipeSearchService(db_config) as service:``
+    の形で使用するか、使用後に必ず close() を呼び出すこと。
+    """
     
     def __init__(self, db_config: DatabaseConfig):
         """RecipeSearchServiceを初期化
@@ -21,14 +77,47 @@ class RecipeSearchService:
         self._connect()
     
     def _connect(self) -> None:
-        """データベースに接続"""
+        """コネクションプールから接続を取得"""
         try:
-            self.conn = psycopg2.connect(**self.db_config.to_connection_params())
+            self.conn = self.db_config.get_connection_pool().getconn()
             self.cur = self.conn.cursor()
         except Error as e:
             print(f"Error connecting to PostgreSQL: {e}")
             raise
     
+    def _prepare_search_statements(self) -> None:
+        """検索用のプリペアドステートメントを準備（接続ごとに1回）
+        
+        プールから取得した接続は準備済みの場合があるため、接続単位で管理する。
+        以降の検索ではEXECUTEのみを送り、解析・実行計画の作成を省く。
+        
+        PREPAREはロールバックされずセッションに残るため、途中で失敗した場合は
+        このモジュールで準備した文だけをDEALLOCATEし、次回の検索で最初から準備し直せるようにする。
+        （他の利用者がプール接続に準備した文は残す）
+        
+        Raises:
+            Error: ステートメントの準備に失敗した場合
+        """
+        if self.conn in _prepared_connections:
+            return
+        
+        try:
+            for statement in _SEARCH_STATEMENTS.values():
+                self.cur.execute(statement)
+            self.conn.commit()
+        except Error:
+            self.conn.rollback()
+            self.cur.execute(
+                "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s);",
+                (list(_SEARCH_STATEMENTS),)
+            )
+            for (name,) in self.cur.fetchall():
+                self.cur.execute(f"DEALLOCATE {name};")
+            self.conn.commit()
+            raise
+        
+        _prepared_connections.add(self.conn)
+    
     def search_by_ingredient(self, ingredient_keyword: str, limit: int = 10) -> Optional[List[Tuple]]:
         """材料での検索 (pg_bigm使用)
         
@@ -40,24 +129,17 @@ class RecipeSearchService:
             (レシピID, レシピ名, 材料, 類似度) のタプルリスト、失敗時はNone
         """
         try:
-            query = """
-            SELECT DISTINCT r.id, r.name, array_agg(ri.ingredient ORDER BY ri.sort_order) as ingredients,
-                   MAX(bigm_similarity(ri.ingredient, %s)) as max_similarity
-            FROM edo_recipes r
-            JOIN recipe_ingredients ri ON r.id = ri.recipe_id
-            WHERE ri.ingredient LIKE %s
-            GROUP BY r.id, r.name
-            ORDER BY max_similarity DESC, r.name
-            LIMIT %s;
-            """
+            self._prepare_search_statements()
             
             search_pattern = f"%{ingredient_keyword}%"
             
-            self.cur.execute(query, (ingredient_keyword, search_pattern, limit))
+            self.cur.execute("EXECUTE search_by_ingredient_stmt (%s, %s, %s);",
+                             (ingredient_keyword, search_pattern, limit))
             return self.cur.fetchall()
             
         except Error as e:
             print(f"Error searching by ingredient: {e}")
+            self.conn.rollback()
             return None
     
     def search_by_fulltext(self, search_keyword: str, limit: int = 10) -> Optional[List[Tuple]]:
@@ -71,25 +153,17 @@ class RecipeSearchService:
             (レシピID, レシピ名, 説明文, 類似度スコア) のタプルリスト、失敗時はNone
         """
         try:
-            query = """
-            SELECT r.id, r.name, r.description,
-                   GREATEST(
-                       bigm_similarity(r.name, %s),
-                       bigm_similarity(COALESCE(r.description, ''), %s)
-                   ) as similarity_score
-            FROM edo_recipes r
-            WHERE (r.name LIKE %s OR COALESCE(r.description, '') LIKE %s)
-            ORDER BY similarity_score DESC, r.name
-            LIMIT %s;
-            """
+            self._prepare_search_statements()
             
             search_pattern = f"%{search_keyword}%"
             
-            self.cur.execute(query, (search_keyword, search_keyword, search_pattern, search_pattern, limit))
+            self.cur.execute("EXECUTE search_by_fulltext_stmt (%s, %s, %s);",
+                             (search_keyword, search_pattern, limit))
             return self.cur.fetchall()
             
         except Error as e:
             print(f"Error in fulltext search: {e}")
+            self.conn.rollback()
             return None
     
     def search_combined(self, recipe_keyword: str, ingredient_keyword: str, limit: int = 10) -> Optional[List[Tuple]]:
@@ -104,40 +178,21 @@ class RecipeSearchService:
             (レシピID, レシピ名, 説明文, 材料リスト, 総合スコア) のタプルリスト、失敗時はNone
         """
         try:
-            query = """
-            SELECT DISTINCT r.id, r.name, r.description, 
-                   array_agg(ri.ingredient ORDER BY ri.sort_order) as ingredients,
-                   GREATEST(
-                       bigm_similarity(r.name, %s),
-                       bigm_similarity(COALESCE(r.description, ''), %s)
-                   ) as recipe_similarity,
-                   MAX(bigm_similarity(ri.ingredient, %s)) as ingredient_similarity,
-                   (GREATEST(
-                       bigm_similarity(r.name, %s),
-                       bigm_similarity(COALESCE(r.description, ''), %s)
-                   ) + MAX(bigm_similarity(ri.ingredient, %s))) as total_score
-            FROM edo_recipes r
-            JOIN recipe_ingredients ri ON r.id = ri.recipe_id
-            WHERE (r.name LIKE %s OR COALESCE(r.description, '') LIKE %s)
-              AND ri.ingredient LIKE %s
-            GROUP BY r.id, r.name, r.description
-            ORDER BY total_score DESC, r.name
-            LIMIT %s;
-            """
+            self._prepare_search_statements()
             
             recipe_pattern = f"%{recipe_keyword}%"
             ingredient_pattern = f"%{ingredient_keyword}%"
             
-            self.cur.execute(query, (
-                recipe_keyword, recipe_keyword, ingredient_keyword,  # similarity計算用
-                recipe_keyword, recipe_keyword, ingredient_keyword,  # total_score計算用
-                recipe_pattern, recipe_pattern, ingredient_pattern,  # WHERE条件用
+            self.cur.execute("EXECUTE search_combined_stmt (%s, %s, %s, %s, %s);", (
+                recipe_keyword, ingredient_keyword,  # similarity計算用
+                recipe_pattern, ingredient_pattern,  # WHERE条件用
                 limit
             ))
             return self.cur.fetchall()
             
         except Error as e:
             print(f"Error in combined search: {e}")
+            self.conn.rollback()
             return None
     
     def get_recipe_details(self, recipe_id: int) -> Optional[Dict]:
@@ -150,10 +205,21 @@ class RecipeSearchService:
             レシピ詳細情報の辞書、失敗時はNone
         """
         try:
-            # 基本情報取得
+            # 基本情報・材料・手順を1回のクエリで取得
             self.cur.execute("""
-                SELECT id, name, url, description, tips, original_text, modern_translation
-                FROM edo_recipes WHERE id = %s;
+                SELECT r.id, r.name, r.url, r.description, r.tips, r.original_text, r.modern_translation,
+                       ARRAY(SELECT ri.ingredient FROM recipe_ingredients ri
+                             WHERE ri.recipe_id = r.id ORDER BY ri.sort_order) AS ingredients,
+                       ARRAY(SELECT ri.instruction FROM recipe_instructions ri
+                             WHERE ri.recipe_id = r.id AND ri.instruction_type = 'modern'
+                             ORDER BY ri.step_number) AS modern_instructions,
+                       ARRAY(SELECT ri.instruction FROM recipe_instructions ri
+                             WHERE ri.recipe_id = r.id AND ri.instruction_type = 'translation'
+                             ORDER BY ri.step_number) AS translation_instructions,
+                       ARRAY(SELECT ri.instruction FROM recipe_instructions ri
+                             WHERE ri.recipe_id = r.id AND ri.instruction_type = 'original'
+                             ORDER BY ri.step_number) AS original_instructions
+                FROM edo_recipes r WHERE r.id = %s;
             """, (recipe_id,))
             
             recipe_row = self.cur.fetchone()
@@ -167,34 +233,18 @@ class RecipeSearchService:
                 'description': recipe_row[3],
                 'tips': recipe_row[4],
                 'original_text': recipe_row[5],
-                'modern_translation': recipe_row[6]
+                'modern_translation': recipe_row[6],
+                'ingredients': recipe_row[7],
+                'modern_instructions': recipe_row[8],
+                'translation_instructions': recipe_row[9],
+                'original_instructions': recipe_row[10]
             }
             
-            # 材料取得
-            self.cur.execute("""
-                SELECT ingredient FROM recipe_ingredients 
-                WHERE recipe_id = %s ORDER BY sort_order;
-            """, (recipe_id,))
-            
-            ingredients = [row[0] for row in self.cur.fetchall()]
-            recipe_details['ingredients'] = ingredients
-            
-            # 手順取得
-            instruction_types = ['modern', 'translation', 'original']
-            for inst_type in instruction_types:
-                self.cur.execute("""
-                    SELECT instruction FROM recipe_instructions 
-                    WHERE recipe_id = %s AND instruction_type = %s 
-                    ORDER BY step_number;
-                """, (recipe_id, inst_type))
-                
-                instructions = [row[0] for row in self.cur.fetchall()]
-                recipe_details[f'{inst_type}_instructions'] = instructions
-            
             return recipe_details
             
         except Error as e:
             print(f"Error getting recipe details: {e}")
+            self.conn.rollback()
             return None
     
     def get_random_recipes(self, count: int = 5) -> Optional[List[Tuple]]:
@@ -207,17 +257,39 @@ class RecipeSearchService:
             (レシピID, レシピ名) のタプルリスト、失敗時はNone
         """
         try:
+            # 統計情報の推定行数から、必要件数の約10倍を得られるサンプリング率を決定
+            self.cur.execute("""
+                SELECT reltuples FROM pg_class WHERE oid = 'edo_recipes'::regclass;
+            """)
+            estimated_rows = self.cur.fetchone()[0]
+            sample_percent = 100.0
+            if estimated_rows > 0:
+                sample_percent = min(100.0, count * 10 * 100.0 / estimated_rows)
+            
+            # 走査時にサンプリングし、並び替えはサンプル行のみに限定
             query = """
-            SELECT id, name FROM edo_recipes 
-            ORDER BY RANDOM() 
+            SELECT id, name FROM edo_recipes TABLESAMPLE BERNOULLI (%s)
+            ORDER BY RANDOM()
             LIMIT %s;
             """
             
-            self.cur.execute(query, (count,))
-            return self.cur.fetchall()
+            self.cur.execute(query, (sample_percent, count))
+            rows = self.cur.fetchall()
+            
+            if len(rows) < count and sample_percent < 100.0:
+                # サンプル不足時は全件から抽選
+                self.cur.execute("""
+                    SELECT id, name FROM edo_recipes 
+                    ORDER BY RANDOM() 
+                    LIMIT %s;
+                """, (count,))
+                rows = self.cur.fetchall()
+            
+            return rows
             
         except Error as e:
             print(f"Error getting random recipes: {e}")
+            self.conn.rollback()
             return None
     
     def get_all_ingredients(self) -> Optional[List[str]]:
@@ -237,14 +309,19 @@ class RecipeSearchService:
             
         except Error as e:
             print(f"Error getting all ingredients: {e}")
+            self.conn.rollback()
             return None
     
     def close(self) -> None:
-        """データベース接続を適切にクローズ"""
+        """データベース接続をコネクションプールに返却（複数回呼び出しても安全）"""
+        if self.conn is None:
+            return
+        
         if self.cur:
             self.cur.close()
-        if self.conn:
-            self.conn.close()
+        self.db_config.get_connection_pool().putconn(self.conn)
+        self.cur = None
+        self.conn = None
     
     def __enter__(self):
         """コンテキストマネージャーのエントリー"""
@@ -252,8 +329,4 @@ class RecipeSearchService:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """コンテキストマネージャーのイグジット"""
-        self.close()
-    
-    def __del__(self):
-        """デストラクタ: データベース接続を適切にクローズ"""
         self.close()
\ No newline at end of file
@@ -1,15 +1,282 @@
 import time
-import math
-import psycopg2
+import queue
+import threading
+import weakref
 from psycopg2 import Error
 from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
 from typing import Optional, List, Tuple, Dict, Any
 
 from .database_config import DatabaseConfig
+from .vector_utils import l2_normalize, to_halfvec_literal
+
+
+class _SearchLogWriter:
+    """検索ログをバックグラウンドでまとめて書き込むクラス
+    
+    検索処理からはキューへの追加のみを行い、INSERTとCOMMITは
+    別スレッドがプールの別接続で一定件数・一定間隔ごとに実行する。
+    """
+    
+    INSERT_QUERY = """
+    INSERT INTO vector_search_logs 
+    (query_text, query_embedding, search_type, limit_count, similarity_threshold,
+     result_count, max_similarity, min_similarity, avg_similarity, execution_time_ms)
+    VALUES %s;
+    """
+    
+    def __init__(self, db_config: DatabaseConfig, batch_size: int = 100,
+                 flush_interval: float = 1.0, max_pending: int = 10000):
+        """_SearchLogWriterを初期化し、書き込みスレッドを開始
+        
+        Args:
+            db_config: データベース設定オブジェクト
+            batch_size: 1回のINSERTでまとめる最大件数
+            flush_interval: キューが満たなくても書き込むまでの最大待ち時間（秒）
+            max_pending: 未書き込みログの上限（超過分は破棄）
+        """
+        self.db_config = db_config
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="vector-search-log-writer", daemon=True)
+        self._thread.start()
+    
+    def enqueue(self, row: Tuple) -> None:
+        """ログ行を書き込みキューに追加（キューが満杯の場合は破棄）
+        
+        Args:
+            row: vector_search_logsの1行分の値
+        """
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            pass
+    
+    def _drain(self, first: Optional[Tuple] = None) -> List[Tuple]:
+        """キューから最大batch_size件を取り出す"""
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write(self, batch: List[Tuple]) -> None:
+        """ログ行をまとめて書き込む（失敗しても例外を送出しない）"""
+        if not batch:
+            return
+        
+        try:
+            with self._write_lock:
+                self._insert(batch)
+        except Exception:
+            # ログ記録失敗（接続取得のタイムアウトや切断を含む）は検索機能に影響しないようにサイレント
+            pass
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _insert(self, batch: List[Tuple]) -> None:
+        """プールの接続でログ行をINSERTしてCOMMIT"""
+        pool = self.db_config.get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, self.INSERT_QUERY, batch, page_size=self.batch_size)
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            # 切断された接続はプールに戻さず破棄
+            pool.putconn(conn, close=bool(conn.closed))
+    
+    def _run(self) -> None:
+        """書き込みスレッドのメインループ"""
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            try:
+                self._write(self._drain(first))
+            except Exception:
+                # 想定外の例外でも書き込みスレッドを停止させない
+                pass
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """キューに追加済みのログがすべて書き込まれるまで待機
+        
+        Args:
+            timeout: 待機する最大時間（秒）
+            
+        Returns:
+            すべて書き込まれた場合True、タイムアウトした場合False
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def close(self) -> None:
+        """書き込みスレッドを停止し、残りのログを書き込む"""
+        self._stopped.set()
+        self._thread.join()
+        while not self._queue.empty():
+            self._write(self._drain())
+
+
+# ベクター検索対象（埋め込みカラム・テキストカラムの接頭辞）
+VECTOR_SEARCH_TYPES = ('description', 'ingredients', 'instructions', 'combined')
+
+
+def _build_vector_search_statements() -> Dict[str, str]:
+    """ベクター検索用のPREPARE文を検索タイプごとに生成
+    
+    Returns:
+        ステートメント名 -> PREPARE文の辞書
+    """
+    statements = {}
+    
+    for search_type in VECTOR_SEARCH_TYPES:
+        embedding_column = f"{search_type}_embedding"
+        text_column = f"{search_type}_text"
+        
+        # 埋め込みは単位ベクトルで保存しているため、負の内積（<#>）がコサイン距離と同じ順序になる
+        # 閾値は負の内積の形で比較し、ORDER BYと同じ演算子のままHNSWインデックスで処理させる
+        # （閾値の比較はNULLの埋め込みで偽になるため、IS NOT NULL条件は不要）
+        statements[f"semantic_search_{search_type}"] = f"""
+        PREPARE semantic_search_{search_type} (halfvec, float8, int) AS
+        SELECT 
+            rv.recipe_id,
+            r.name as recipe_name,
+            -(rv.{embedding_column} <#> $1) as similarity_score,
+            rv.{text_column} as matched_text,
+            r.description
+        FROM edo_recipe_vectors rv
+        JOIN edo_recipes r ON rv.recipe_id = r.id
+        WHERE rv.{embedding_column} <#> $1 <= $2
+        ORDER BY rv.{embedding_column} <#> $1
+        LIMIT $3;
+        """
+        
+        # 除外するrecipe_idがNULLの場合は自分自身も結果に含める
+        statements[f"find_similar_{search_type}"] = f"""
+        PREPARE find_similar_{search_type} (halfvec, int, int) AS
+        SELECT 
+            rv.recipe_id,
+            r.name as recipe_name,
+            -(rv.{embedding_column} <#> $1) as similarity_score,
+            rv.{text_column} as matched_text
+        FROM edo_recipe_vectors rv
+        JOIN edo_recipes r ON rv.recipe_id = r.id
+        WHERE rv.{embedding_column} IS NOT NULL
+        AND ($2 IS NULL OR rv.recipe_id != $2)
+        ORDER BY rv.{embedding_column} <#> $1
+        LIMIT $3;
+        """
+    
+    # 二値量子化による候補絞り込み（ハミング距離の上位候補のみ半精度ベクターで再ランク）
+    statements["semantic_search_combined_binary"] = """
+    PREPARE semantic_search_combined_binary (halfvec, float8, int, int) AS
+    SELECT 
+        rv.recipe_id,
+        r.name as recipe_name,
+        -(rv.combined_embedding <#> $1) as similarity_score,
+        rv.combined_text as matched_text,
+        r.description
+    FROM (
+        SELECT recipe_id
+        FROM edo_recipe_vectors
+        WHERE combined_embedding IS NOT NULL
+        ORDER BY binary_quantize(combined_embedding)::bit(1536) <~> binary_quantize($1)
+        LIMIT $4
+    ) candidates
+    JOIN edo_recipe_vectors rv ON rv.recipe_id = candidates.recipe_id
+    JOIN edo_recipes r ON rv.recipe_id = r.id
+    WHERE rv.combined_embedding <#> $1 <= $2
+    ORDER BY rv.combined_embedding <#> $1
+    LIMIT $3;
+    """
+    
+    # ハイブリッド検索（pg_bigmのキーワード候補 + ベクター近傍候補を統合して再スコアリング）
+    statements["hybrid_search"] = """
+    PREPARE hybrid_search (text, halfvec, int, float8, float8, int) AS
+    WITH candidates AS (
+        (
+            SELECT recipe_id
+            FROM edo_recipe_vectors
+            WHERE combined_embedding IS NOT NULL
+            ORDER BY combined_embedding <#> $2
+            LIMIT $3
+        )
+        UNION
+        (
+            SELECT rv.recipe_id
+            FROM edo_recipe_vectors rv
+            JOIN edo_recipes r ON rv.recipe_id = r.id
+            WHERE rv.combined_embedding IS NOT NULL
+            AND (r.name =% $1
+                 OR r.description =% $1
+                 OR rv.combined_text =% $1)
+            ORDER BY GREATEST(
+                COALESCE(bigm_similarity(r.name, $1), 0),
+                COALESCE(bigm_similarity(r.description, $1), 0),
+                COALESCE(bigm_similarity(rv.combined_text, $1), 0)
+            ) DESC
+            LIMIT $3
+        )
+    ),
+    candidate_scores AS (
+        SELECT 
+            rv.recipe_id,
+            r.name,
+            GREATEST(
+                COALESCE(bigm_similarity(r.name, $1), 0),
+                COALESCE(bigm_similarity(r.description, $1), 0),
+                COALESCE(bigm_similarity(rv.combined_text, $1), 0)
+            ) as keyword_score,
+            rv.combined_embedding <#> $2 as vector_distance
+        FROM candidates c
+        JOIN edo_recipe_vectors rv ON rv.recipe_id = c.recipe_id
+        JOIN edo_recipes r ON rv.recipe_id = r.id
+    )
+    SELECT 
+        recipe_id,
+        name as recipe_name,
+        ($4 * keyword_score + $5 * -vector_distance) as hybrid_score,
+        keyword_score,
+        -vector_distance as vector_score
+    FROM candidate_scores
+    WHERE keyword_score > 0.0 OR vector_distance < -0.3
+    ORDER BY hybrid_score DESC
+    LIMIT $6;
+    """
+    
+    return statements
+
+
+_VECTOR_SEARCH_STATEMENTS = _build_vector_search_statements()
+
+# 検索用ステートメントを準備済みの接続（プール返却後も準備状態はセッションに残る）
+_prepared_connections = weakref.WeakSet()
 
 
 class RecipeVectorSearchService:
-    """レシピベクター検索サービスクラス（SRP準拠）"""
+    """レシピベクター検索サービスクラス（SRP準拠）
+    
+    接続はコネクションプールから取得するため、``with RecipeVectorSearchService(db_config) as service:``
+    の形で使用するか、使用後に必ず close() を呼び出すこと。
+    """
     
     def __init__(self, db_config: DatabaseConfig):
         """RecipeVectorSearchServiceを初期化
@@ -20,20 +287,69 @@ class RecipeVectorSearchService:
         self.db_config = db_config
         self.conn: Optional[connection] = None
         self.cur = None
+        self._log_writer: Optional[_SearchLogWriter] = None
         self._connect()
     
     def _connect(self) -> None:
-        """データベースに接続"""
+        """コネクションプールから接続を取得"""
         try:
-            self.conn = psycopg2.connect(**self.db_config.to_connection_params())
+            self.conn = self.db_config.get_connection_pool().getconn()
             self.cur = self.conn.cursor()
             print(f"Connected to database: {self.db_config}")
         except Error as e:
             print(f"Error connecting to PostgreSQL: {e}")
             raise
     
+    def _prepare_search_statements(self) -> None:
+        """検索用のプリペアドステートメントを準備（接続ごとに1回）
+        
+        テーブル作成前に接続する場合があるため、初回の検索時に準備する。
+        クエリ埋め込みは$1として1回だけ送信・変換され、解析・実行計画の作成も省かれる。
+        
+        PREPAREはロールバックされずセッションに残るため、途中で失敗した場合は
+        このモジュールで準備した文だけをDEALLOCATEし、次回の検索で最初から準備し直せるようにする。
+        （他の利用者がプール接続に準備した文は残す）
+        
+        Raises:
+            Error: ステートメントの準備に失敗した場合
+        """
+        if self.conn in _prepared_connections:
+            return
+        
+        try:
+            for statement in _VECTOR_SEARCH_STATEMENTS.values():
+                self.cur.execute(statement)
+            self.conn.commit()
+        except Error:
+            self.conn.rollback()
+            self.cur.execute(
+                "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s);",
+                (list(_VECTOR_SEARCH_STATEMENTS),)
+            )
+            for (name,) in self.cur.fetchall():
+                self.cur.execute(f"DEALLOCATE {name};")
+            self.conn.commit()
+            raise
+        
+        _prepared_connections.add(self.conn)
+    
+    def _apply_vector_search_settings(self, limit: int, ef_search: Optional[int] = None) -> None:
+        """インデックス種別に応じた検索パラメータを現在のトランザクションに設定
+        
+        Args:
+            limit: 検索結果数の上限（HNSWの候補リストはこれより小さくしない）
+            ef_search: HNSWの探索候補数（省略時は設定値を使用）
+        """
+        if self.db_config.index_type == 'ivfflat':
+            self.cur.execute(f"SET LOCAL ivfflat.probes = {int(self.db_config.ivfflat_probes)};")
+        else:
+            ef_search = ef_search if ef_search is not None else self.db_config.hnsw_ef_search
+            self.cur.execute(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), int(limit))};")
+    
     def semantic_search_recipes(self, query_embedding: List[float], search_type: str = 'combined', 
-                              limit: int = 5, similarity_threshold: float = 0.0) -> List[Tuple]:
+                              limit: int = 5, similarity_threshold: float = 0.0,
+                              ef_search: Optional[int] = None,
+                              binary_candidates: Optional[int] = None) -> List[Tuple]:
         """意味的類似性によるレシピ検索
         
         Args:
@@ -41,6 +357,8 @@ class RecipeVectorSearchService:
             search_type: 検索対象 ('description', 'ingredients', 'instructions', 'combined')
             limit: 検索結果数の上限
             similarity_threshold: 類似度の最小閾値
+            ef_search: HNSWの探索候補数（大きいほど再現率が上がり低速になる。省略時は設定値）
+            binary_candidates: 二値量子化で絞り込む候補数（combinedのみ対応。省略時は絞り込みなし）
             
         Returns:
             (recipe_id, recipe_name, similarity_score, matched_text, description)のタプルリスト
@@ -48,45 +366,43 @@ class RecipeVectorSearchService:
         start_time = time.time()
         
         try:
-            # 検索タイプに応じてカラムを選択
-            embedding_column = f"{search_type}_embedding"
-            text_column = f"{search_type}_text"
+            if search_type not in VECTOR_SEARCH_TYPES:
+                print(f"未対応の検索タイプです: {search_type}")
+                return []
             
-            # コサイン類似度検索クエリ
-            search_query = f"""
-            SELECT 
-                rv.recipe_id,
-                r.name as recipe_name,
-                1 - (rv.{embedding_column} <=> %s::vector) as similarity_score,
-                rv.{text_column} as matched_text,
-                r.description
-            FROM edo_recipe_vectors rv
-            JOIN edo_recipes r ON rv.recipe_id = r.id
-            WHERE rv.{embedding_column} IS NOT NULL
-            AND (1 - (rv.{embedding_column} <=> %s::vector)) >= %s
-            ORDER BY rv.{embedding_column} <=> %s::vector
-            LIMIT %s;
-            """
+            self._prepare_search_statements()
             
-            # クエリ実行
-            embedding_str = f"[{','.join(map(str, query_embedding))}]"
-            self.cur.execute(search_query, (embedding_str, embedding_str, similarity_threshold, embedding_str, limit))
+            # クエリ実行（埋め込みの文字列化は1回のみで、ログ記録でも再利用）
+            embedding_literal = to_halfvec_literal(l2_normalize(query_embedding))
+            if binary_candidates and search_type == 'combined':
+                candidate_count = max(binary_candidates, limit)
+                self._apply_vector_search_settings(candidate_count, ef_search)
+                self.cur.execute("EXECUTE semantic_search_combined_binary (%s, %s, %s, %s);",
+                                 (embedding_literal, -similarity_threshold, limit, candidate_count))
+            else:
+                self._apply_vector_search_settings(limit, ef_search)
+                self.cur.execute(f"EXECUTE semantic_search_{search_type} (%s, %s, %s);",
+                                 (embedding_literal, -similarity_threshold, limit))
             
             results = self.cur.fetchall()
+            # トランザクションを終了し、SET LOCALの検索パラメータを次の検索に残さない
+            self.conn.commit()
             execution_time = (time.time() - start_time) * 1000  # ms
             
             # 検索ログを記録
-            self._log_search_query("", query_embedding, search_type, limit, similarity_threshold, 
+            self._log_search_query("", embedding_literal, search_type, limit, similarity_threshold, 
                                  len(results), execution_time)
             
             return results
             
         except Error as e:
             print(f"Error in semantic search: {e}")
+            self.conn.rollback()
             return []
     
     def find_similar_recipes(self, recipe_id: int, search_type: str = 'combined', 
-                           limit: int = 5, exclude_self: bool = True) -> List[Tuple]:
+                           limit: int = 5, exclude_self: bool = True,
+                           ef_search: Optional[int] = None) -> List[Tuple]:
         """指定レシピに類似するレシピを検索
         
         Args:
@@ -94,14 +410,20 @@ class RecipeVectorSearchService:
             search_type: 検索対象タイプ
             limit: 検索結果数の上限
             exclude_self: 自分自身を結果から除外するかどうか
+            ef_search: HNSWの探索候補数（省略時は設定値）
             
         Returns:
             (recipe_id, recipe_name, similarity_score, matched_text)のタプルリスト
         """
         try:
+            if search_type not in VECTOR_SEARCH_TYPES:
+                print(f"未対応の検索タイプです: {search_type}")
+                return []
+            
+            self._prepare_search_statements()
+            
             # 基準レシピの埋め込みを取得
             embedding_column = f"{search_type}_embedding"
-            text_column = f"{search_type}_text"
             
             get_embedding_query = f"""
             SELECT {embedding_column}
@@ -109,108 +431,72 @@ class RecipeVectorSearchService:
             WHERE recipe_id = %s AND {embedding_column} IS NOT NULL;
             """
             
-            self.cur.execute(get_embedding_query, (recipe_id,))
-            result = self.cur.fetchone()
-            
-            if not result:
-                print(f"レシピID {recipe_id} の埋め込みが見つかりません")
-                return []
-            
-            base_embedding = result[0]
-            
-            # 類似レシピ検索
-            exclusion_clause = "AND rv.recipe_id != %s" if exclude_self else ""
-            
-            similar_query = f"""
-            SELECT 
-                rv.recipe_id,
-                r.name as recipe_name,
-                1 - (rv.{embedding_column} <=> %s::vector) as similarity_score,
-                rv.{text_column} as matched_text
-            FROM edo_recipe_vectors rv
-            JOIN edo_recipes r ON rv.recipe_id = r.id
-            WHERE rv.{embedding_column} IS NOT NULL
-            {exclusion_clause}
-            ORDER BY rv.{embedding_column} <=> %s::vector
-            LIMIT %s;
-            """
-            
-            params = [base_embedding, base_embedding, limit]
-            if exclude_self:
-                params.insert(-2, recipe_id)  # 除外するrecipe_idを追加
-            
-            self.cur.execute(similar_query, params)
-            return self.cur.fetchall()
+            # 呼び出しごとのカーソルで実行し、結果を共有カーソルに残さない
+            with self.conn.cursor() as cur:
+                cur.execute(get_embedding_query, (recipe_id,))
+                result = cur.fetchone()
+                
+                if not result:
+                    print(f"レシピID {recipe_id} の埋め込みが見つかりません")
+                    return []
+                
+                base_embedding = result[0]
+                
+                # 類似レシピ検索
+                excluded_recipe_id = recipe_id if exclude_self else None
+                
+                self._apply_vector_search_settings(limit, ef_search)
+                cur.execute(f"EXECUTE find_similar_{search_type} (%s, %s, %s);",
+                            (base_embedding, excluded_recipe_id, limit))
+                results = cur.fetchall()
+            self.conn.commit()  # SET LOCALの検索パラメータをリセット
+            return results
             
         except Error as e:
             print(f"Error finding similar recipes: {e}")
+            self.conn.rollback()
             return []
     
     def hybrid_search(self, query_text: str, query_embedding: List[float], 
                      keyword_weight: float = 0.3, vector_weight: float = 0.7,
-                     limit: int = 5) -> List[Tuple]:
+                     limit: int = 5, candidate_count: int = 100,
+                     ef_search: Optional[int] = None) -> List[Tuple]:
         """キーワード検索とベクター検索を組み合わせたハイブリッド検索
         
+        ベクター近傍上位とpg_bigmのキーワード一致からそれぞれ候補を取得し、
+        その候補に対してのみ両方のスコアを計算する。
+        
         Args:
             query_text: 検索キーワード
             query_embedding: クエリの埋め込みベクター
             keyword_weight: キーワード検索の重み
             vector_weight: ベクター検索の重み
             limit: 検索結果数の上限
+            candidate_count: ベクター検索・キーワード検索それぞれで取得する候補数
+            ef_search: HNSWの探索候補数（省略時は設定値）
             
         Returns:
             (recipe_id, recipe_name, hybrid_score, keyword_score, vector_score)のタプルリスト
         """
         try:
-            # ハイブリッド検索クエリ（pg_bigmのキーワード検索 + ベクター検索）
-            hybrid_query = """
-            WITH keyword_scores AS (
-                SELECT 
-                    rv.recipe_id,
-                    r.name,
-                    GREATEST(
-                        COALESCE(bigm_similarity(r.name, %s), 0),
-                        COALESCE(bigm_similarity(r.description, %s), 0),
-                        COALESCE(bigm_similarity(rv.combined_text, %s), 0)
-                    ) as keyword_score
-                FROM edo_recipe_vectors rv
-                JOIN edo_recipes r ON rv.recipe_id = r.id
-                WHERE rv.combined_embedding IS NOT NULL
-            ),
-            vector_scores AS (
-                SELECT 
-                    rv.recipe_id,
-                    r.name,
-                    1 - (rv.combined_embedding <=> %s::vector) as vector_score
-                FROM edo_recipe_vectors rv
-                JOIN edo_recipes r ON rv.recipe_id = r.id
-                WHERE rv.combined_embedding IS NOT NULL
-            )
-            SELECT 
-                ks.recipe_id,
-                ks.name as recipe_name,
-                (%s * ks.keyword_score + %s * vs.vector_score) as hybrid_score,
-                ks.keyword_score,
-                vs.vector_score
-            FROM keyword_scores ks
-            JOIN vector_scores vs ON ks.recipe_id = vs.recipe_id
-            WHERE ks.keyword_score > 0.0 OR vs.vector_score > 0.3
-            ORDER BY hybrid_score DESC
-            LIMIT %s;
-            """
+            self._prepare_search_statements()
             
-            embedding_str = f"[{','.join(map(str, query_embedding))}]"
-            self.cur.execute(hybrid_query, (
-                query_text, query_text, query_text,  # キーワード検索用
-                embedding_str,  # ベクター検索用
+            self._apply_vector_search_settings(max(candidate_count, limit), ef_search)
+            self.cur.execute("EXECUTE hybrid_search (%s, %s, %s, %s, %s, %s);", (
+                query_text,  # キーワード検索用
+                to_halfvec_literal(l2_normalize(query_embedding)),  # ベクター検索用
+                max(candidate_count, limit),
                 keyword_weight, vector_weight,  # 重み
                 limit
             ))
             
-            return self.cur.fetchall()
+            results = self.cur.fetchall()
+            self.conn.commit()  # SET LOCALの検索パラメータをリセット
+            return results
             
         except Error as e:
             print(f"Error in hybrid search: {e}")
+            self.conn.rollback()
             return []
     
     def get_recipe_details_with_vectors(self, recipe_id: int) -> Optional[Dict[str, Any]]:
@@ -223,11 +509,17 @@ class RecipeVectorSearchService:
             レシピ詳細辞書、失敗時はNone
         """
         try:
+            # レシピ本体・ベクターデータ・材料・手順を1回のクエリで取得
             detail_query = """
             SELECT 
                 r.id, r.name, r.url, r.description, r.tips,
                 rv.description_text, rv.ingredients_text, rv.instructions_text, rv.combined_text,
-                rv.embedding_model, rv.created_at as vector_created_at
+                rv.embedding_model, rv.created_at as vector_created_at,
+                ARRAY(SELECT ri.ingredient FROM recipe_ingredients ri
+                      WHERE ri.recipe_id = r.id ORDER BY ri.sort_order) as ingredients,
+                ARRAY(SELECT ri.instruction FROM recipe_instructions ri
+                      WHERE ri.recipe_id = r.id AND ri.instruction_type = 'modern'
+                      ORDER BY ri.step_number) as instructions
             FROM edo_recipes r
             LEFT JOIN edo_recipe_vectors rv ON r.id = rv.recipe_id
             WHERE r.id = %s;
@@ -239,32 +531,14 @@ class RecipeVectorSearchService:
             if not result:
                 return None
             
-            # 材料と手順を取得
-            ingredients_query = """
-            SELECT ingredient FROM recipe_ingredients 
-            WHERE recipe_id = %s ORDER BY sort_order;
-            """
-            
-            instructions_query = """
-            SELECT instruction FROM recipe_instructions 
-            WHERE recipe_id = %s AND instruction_type = 'modern'
-            ORDER BY step_number;
-            """
-            
-            self.cur.execute(ingredients_query, (recipe_id,))
-            ingredients = [row[0] for row in self.cur.fetchall()]
-            
-            self.cur.execute(instructions_query, (recipe_id,))
-            instructions = [row[0] for row in self.cur.fetchall()]
-            
             return {
                 "id": result[0],
                 "name": result[1],
                 "url": result[2],
                 "description": result[3],
                 "tips": result[4],
-                "ingredients": ingredients,
-                "instructions": instructions,
+                "ingredients": result[11],
+                "instructions": result[12],
                 "vector_data": {
                     "description_text": result[5],
                     "ingredients_text": result[6],
@@ -277,6 +551,7 @@ class RecipeVectorSearchService:
             
         except Error as e:
             print(f"Error getting recipe details: {e}")
+            self.conn.rollback()
             return None
     
     def calculate_recipe_similarities(self, limit_pairs: int = 100) -> bool:
@@ -291,69 +566,45 @@ class RecipeVectorSearchService:
         try:
             print("🔄 レシピ間類似性の計算を開始...")
             
-            # 全レシピの埋め込みを取得
-            get_all_embeddings_query = """
-            SELECT recipe_id, description_embedding, ingredients_embedding, 
-                   instructions_embedding, combined_embedding
-            FROM edo_recipe_vectors
-            WHERE combined_embedding IS NOT NULL
-            ORDER BY recipe_id;
+            # レシピペアの選定と類似度計算をDB内で一括実行（pgvectorの距離演算を使用）
+            similarity_query = """
+            INSERT INTO recipe_similarities 
+            (source_recipe_id, target_recipe_id, description_similarity, 
+             ingredients_similarity, instructions_similarity, combined_similarity)
+            SELECT 
+                p.source_recipe_id, p.target_recipe_id,
+                COALESCE(-(a.description_embedding <#> b.description_embedding), 0),
+                COALESCE(-(a.ingredients_embedding <#> b.ingredients_embedding), 0),
+                COALESCE(-(a.instructions_embedding <#> b.instructions_embedding), 0),
+                COALESCE(-(a.combined_embedding <#> b.combined_embedding), 0)
+            FROM (
+                SELECT a.recipe_id AS source_recipe_id, b.recipe_id AS target_recipe_id
+                FROM edo_recipe_vectors a
+                JOIN edo_recipe_vectors b ON a.recipe_id < b.recipe_id
+                WHERE a.combined_embedding IS NOT NULL
+                AND b.combined_embedding IS NOT NULL
+                ORDER BY a.recipe_id, b.recipe_id
+                LIMIT %s
+            ) p
+            JOIN edo_recipe_vectors a ON a.recipe_id = p.source_recipe_id
+            JOIN edo_recipe_vectors b ON b.recipe_id = p.target_recipe_id
+            ON CONFLICT (source_recipe_id, target_recipe_id) 
+            DO UPDATE SET
+                description_similarity = EXCLUDED.description_similarity,
+                ingredients_similarity = EXCLUDED.ingredients_similarity,
+                instructions_similarity = EXCLUDED.instructions_similarity,
+                combined_similarity = EXCLUDED.combined_similarity;
             """
             
-            self.cur.execute(get_all_embeddings_query)
-            all_embeddings = self.cur.fetchall()
-            
-            if len(all_embeddings) < 2:
-                print("⚠️  計算に必要な埋め込みデータが不足しています")
-                return False
-            
-            # 類似性計算とDB挿入
-            similarity_pairs = []
-            pair_count = 0
-            
-            for i, recipe1 in enumerate(all_embeddings):
-                for j, recipe2 in enumerate(all_embeddings[i+1:], i+1):
-                    if pair_count >= limit_pairs:
-                        break
-                    
-                    # 各タイプの類似度計算
-                    desc_sim = self._cosine_similarity(recipe1[1], recipe2[1])
-                    ing_sim = self._cosine_similarity(recipe1[2], recipe2[2])
-                    inst_sim = self._cosine_similarity(recipe1[3], recipe2[3])
-                    comb_sim = self._cosine_similarity(recipe1[4], recipe2[4])
-                    
-                    similarity_pairs.append((
-                        recipe1[0], recipe2[0],  # source_recipe_id, target_recipe_id
-                        desc_sim, ing_sim, inst_sim, comb_sim
-                    ))
-                    
-                    pair_count += 1
-                
-                if pair_count >= limit_pairs:
-                    break
+            self.cur.execute(similarity_query, (limit_pairs,))
+            pair_count = self.cur.rowcount
+            self.conn.commit()
             
-            # バッチでDB挿入
-            if similarity_pairs:
-                insert_query = """
-                INSERT INTO recipe_similarities 
-                (source_recipe_id, target_recipe_id, description_similarity, 
-                 ingredients_similarity, instructions_similarity, combined_similarity)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (source_recipe_id, target_recipe_id) 
-                DO UPDATE SET
-                    description_similarity = EXCLUDED.description_similarity,
-                    ingredients_similarity = EXCLUDED.ingredients_similarity,
-                    instructions_similarity = EXCLUDED.instructions_similarity,
-                    combined_similarity = EXCLUDED.combined_similarity;
-                """
-                
-                self.cur.executemany(insert_query, similarity_pairs)
-                self.conn.commit()
-                
-                print(f"✓ {len(similarity_pairs)}ペアの類似性を計算・保存しました")
+            if pair_count > 0:
+                print(f"✓ {pair_count}ペアの類似性を計算・保存しました")
                 return True
             else:
-                print("⚠️  計算可能なペアがありません")
+                print("⚠️  計算に必要な埋め込みデータが不足しています")
                 return False
                 
         except Error as e:
@@ -370,6 +621,10 @@ class RecipeVectorSearchService:
         Returns:
             検索ログのタプルリスト
         """
+        # バックグラウンドで書き込み中のログも結果に含める
+        if self._log_writer is not None:
+            self._log_writer.flush()
+        
         try:
             log_query = """
             SELECT query_text, search_type, result_count, max_similarity, 
@@ -379,120 +634,56 @@ class RecipeVectorSearchService:
             LIMIT %s;
             """
             
-            self.cur.execute(log_query, (limit,))
-            return self.cur.fetchall()
+            with self.conn.cursor() as cur:
+                cur.execute(log_query, (limit,))
+                return cur.fetchall()
             
         except Error as e:
             print(f"Error getting search logs: {e}")
+            self.conn.rollback()
             return []
     
-    def _cosine_similarity(self, vec1, vec2) -> float:
-        """コサイン類似度を計算
-        
-        Args:
-            vec1: ベクター1（List[float]またはPostgreSQL vector型文字列）
-            vec2: ベクター2（List[float]またはPostgreSQL vector型文字列）
-            
-        Returns:
-            コサイン類似度 (0.0-1.0)
-        """
-        # PostgreSQL vector型から Python listに変換
-        v1 = self._parse_vector(vec1)
-        v2 = self._parse_vector(vec2)
-        
-        if not v1 or not v2 or len(v1) != len(v2):
-            return 0.0
-        
-        dot_product = sum(a * b for a, b in zip(v1, v2))
-        norm1 = math.sqrt(sum(a * a for a in v1))
-        norm2 = math.sqrt(sum(b * b for b in v2))
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
-    
-    def _parse_vector(self, vector_data) -> List[float]:
-        """PostgreSQL vector型データをPython listに変換
-        
-        Args:
-            vector_data: PostgreSQL vector型データ（文字列またはリスト）
-            
-        Returns:
-            float値のリスト
-        """
-        if vector_data is None:
-            return []
-        
-        # 既にリストの場合はそのまま返す
-        if isinstance(vector_data, list):
-            return [float(x) for x in vector_data]
-        
-        # 文字列の場合はパース
-        if isinstance(vector_data, str):
-            # PostgreSQL vector型は "[1.0,2.0,3.0]" 形式
-            vector_str = vector_data.strip()
-            if vector_str.startswith('[') and vector_str.endswith(']'):
-                vector_str = vector_str[1:-1]  # 角括弧を除去
-            
-            try:
-                return [float(x.strip()) for x in vector_str.split(',') if x.strip()]
-            except (ValueError, AttributeError):
-                print(f"Warning: Failed to parse vector data: {vector_data}")
-                return []
-        
-        # その他の型（メモリビューなど）
-        try:
-            return [float(x) for x in vector_data]
-        except (TypeError, ValueError):
-            print(f"Warning: Unsupported vector data type: {type(vector_data)}")
-            return []
-    
-    def _log_search_query(self, query_text: str, query_embedding: List[float], 
+    def _log_search_query(self, query_text: str, query_embedding: Optional[str], 
                          search_type: str, limit_count: int, similarity_threshold: float,
                          result_count: int, execution_time_ms: float) -> None:
         """検索クエリをログに記録
         
         Args:
             query_text: 検索テキスト
-            query_embedding: クエリ埋め込み
+            query_embedding: クエリ埋め込みのテキスト表現（'[x1,x2,...]' 形式）
             search_type: 検索タイプ
             limit_count: 結果数制限
             similarity_threshold: 類似度閾値
             result_count: 実際の結果数
             execution_time_ms: 実行時間（ミリ秒）
         """
-        try:
-            # 結果の統計計算（簡易版）
-            max_similarity = 1.0 if result_count > 0 else 0.0
-            min_similarity = similarity_threshold
-            avg_similarity = (max_similarity + min_similarity) / 2
-            
-            embedding_str = f"[{','.join(map(str, query_embedding))}]" if query_embedding else None
-            
-            log_query = """
-            INSERT INTO vector_search_logs 
-            (query_text, query_embedding, search_type, limit_count, similarity_threshold,
-             result_count, max_similarity, min_similarity, avg_similarity, execution_time_ms)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-            """
-            
-            self.cur.execute(log_query, (
-                query_text, embedding_str, search_type, limit_count, similarity_threshold,
-                result_count, max_similarity, min_similarity, avg_similarity, execution_time_ms
-            ))
-            self.conn.commit()
-            
-        except Error:
-            # ログ記録失敗は検索機能に影響しないようにサイレント
-            pass
+        # 結果の統計計算（簡易版）
+        max_similarity = 1.0 if result_count > 0 else 0.0
+        min_similarity = similarity_threshold
+        avg_similarity = (max_similarity + min_similarity) / 2
+        
+        # 書き込みは検索処理から切り離してバックグラウンドでまとめて実行
+        if self._log_writer is None:
+            self._log_writer = _SearchLogWriter(self.db_config)
+        self._log_writer.enqueue((
+            query_text, query_embedding, search_type, limit_count, similarity_threshold,
+            result_count, max_similarity, min_similarity, avg_similarity, execution_time_ms
+        ))
     
     def close(self) -> None:
-        """データベース接続を適切にクローズ"""
+        """データベース接続をコネクションプールに返却（複数回呼び出しても安全）"""
+        if self._log_writer is not None:
+            self._log_writer.close()
+            self._log_writer = None
+        
+        if self.conn is None:
+            return
+        
         if self.cur:
             self.cur.close()
-        if self.conn:
-            self.conn.close()
+        self.db_config.get_connection_pool().putconn(self.conn)
+        self.cur = None
+        self.conn = None
     
     def __enter__(self):
         """コンテキストマネージャーのエントリー"""
@@ -500,8 +691,4 @@ class RecipeVectorSearchService:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """コンテキストマネージャーのイグジット"""
-        self.close()
-    
-    def __del__(self):
-        """デストラクタ: データベース接続を適切にクローズ"""
         self.close()
\ No newline at end of file
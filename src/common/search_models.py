@@ -16,9 +16,9 @@ class SearchMode(Enum):
     VECTOR_ONLY = "vector"     # Vector search only
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SearchCondition:
-    """Search condition parameters"""
+    """Search condition parameters (immutable; use dataclasses.replace to derive variants)"""
     # Required keyword conditions
     required_keywords: List[str] = field(default_factory=list)
     required_similarity_threshold: float = 0.1  # pg_bigm threshold
@@ -41,18 +41,18 @@ class SearchCondition:
 
     def __post_init__(self):
         """Validate search condition parameters"""
-        if self.fulltext_weight + self.vector_weight != 1.0:
-            # Normalize weights if they don't sum to 1.0
-            total = self.fulltext_weight + self.vector_weight
-            if total > 0:
-                self.fulltext_weight /= total
-                self.vector_weight /= total
-            else:
-                self.fulltext_weight = 0.5
-                self.vector_weight = 0.5
-
-
-@dataclass
+        # Always normalize weights (idempotent when they already sum to 1.0);
+        # fall back to equal weights when both are zero
+        total = self.fulltext_weight + self.vector_weight
+        if total > 0:
+            object.__setattr__(self, 'fulltext_weight', self.fulltext_weight / total)
+            object.__setattr__(self, 'vector_weight', self.vector_weight / total)
+        else:
+            object.__setattr__(self, 'fulltext_weight', 0.5)
+            object.__setattr__(self, 'vector_weight', 0.5)
+
+
+@dataclass(slots=True)
 class SearchResult:
     """Individual search result"""
     recipe_id: int
@@ -74,7 +74,7 @@ class SearchResult:
     rank: int = 0                    # Final ranking position
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchStage:
     """Search stage execution information"""
     stage_name: str
@@ -84,7 +84,7 @@ class SearchStage:
     sql_query: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PerformanceMetrics:
     """Performance measurement data"""
     fulltext_time: float = 0.0
@@ -93,6 +93,7 @@ class PerformanceMetrics:
     total_time: float = 0.0
     cpu_percent: float = 0.0
     memory_usage_mb: float = 0.0
+    start_time: Optional[float] = field(default=None, repr=False, compare=False)
     
     def start_timing(self):
         """Start performance timing"""
@@ -101,12 +102,12 @@ class PerformanceMetrics:
     
     def end_timing(self):
         """End performance timing and calculate total"""
-        if hasattr(self, 'start_time'):
+        if self.start_time is not None:
             self.total_time = time.time() - self.start_time
         return self
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResponse:
     """Complete search response"""
     results: List[SearchResult]
@@ -117,7 +118,7 @@ class SearchResponse:
     search_condition: Optional[SearchCondition] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PerformanceComparison:
     """Performance comparison between different search modes"""
     cascade_metrics: PerformanceMetrics
@@ -128,7 +129,7 @@ class PerformanceComparison:
     recommendation_reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryAnalysis:
     """Query analysis results for automatic condition extraction"""
     suggested_required: List[str] = field(default_factory=list)
@@ -0,0 +1,39 @@
+"""
+Vector helpers shared by the pgvector search modules.
+Normalizes query embeddings and converts them to the text representation bound in SQL.
+"""
+import math
+from typing import List
+
+
+def l2_normalize(vector: List[float]) -> List[float]:
+    """ベクトルをL2ノルム1に正規化
+    
+    保存済みの埋め込みは単位ベクトルのため、クエリも正規化しておけば
+    内積（<#>）がコサイン類似度と一致する。
+    
+    Args:
+        vector: 埋め込みベクトル
+        
+    Returns:
+        正規化済みベクトル（ゼロベクトルはそのまま）
+    """
+    norm = math.sqrt(math.fsum(x * x for x in vector))
+    if norm == 0.0:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+def to_halfvec_literal(vector: List[float]) -> str:
+    """クエリ埋め込みをhalfvecのテキスト表現に変換
+    
+    halfvec（fp16）の有効桁数は約3桁のため、5桁に丸めても距離計算の結果は変わらない。
+    psycopg2のARRAY[...]展開と比べて送信サイズとサーバー側のパースコストを削減できる。
+    
+    Args:
+        vector: 埋め込みベクトル
+        
+    Returns:
+        '[x1,x2,...]' 形式の文字列
+    """
+    return '[' + ','.join(f'{x:.5g}' for x in vector) + ']'
@@ -6,41 +6,71 @@
 
 Usage:
     python run_embedding_integration_tests.py
+    CONFIRM_COSTS=yes python run_embedding_integration_tests.py    # Accept costs without the prompt (CI)
     python run_embedding_integration_tests.py --skip-confirmation  # Skip cost warning
     python run_embedding_integration_tests.py --estimate-only     # Show cost estimate only
+    python run_embedding_integration_tests.py --batch             # Use the Batch API (half price, slow)
+    python run_embedding_integration_tests.py --concurrency 5     # Run up to 5 tests at once
+    python run_embedding_integration_tests.py --estimate-only --max-cost 0.001  # Fail if over budget
+    python run_embedding_integration_tests.py --failure-log out.log  # Where tracebacks are written
 """
 
 import sys
 import os
 import unittest
 import argparse
+import tempfile
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, TextIO
 
 # Add current directory to Python path for imports
 sys_path = str(Path(__file__).parent)
 if sys_path not in sys.path:
     sys.path.insert(0, sys_path)
 
-def estimate_test_costs() -> Dict[str, Any]:
+# Tracebacks of failed tests are written here (overwritten on every run)
+DEFAULT_FAILURE_LOG = Path(tempfile.gettempdir()) / 'embedding_integration_failures.log'
+
+def count_fixture_tokens() -> Dict[str, int]:
+    """Count the tokens each integration test sends, using the fixture texts
+    
+    Returns:
+        Mapping of test name to token count
+    """
+    from tests.embedding.integration_fixtures import FIXTURE_TEXTS
+    
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")  # For text-embedding models
+        return {
+            test_name: sum(map(len, encoding.encode_batch(texts)))
+            for test_name, texts in FIXTURE_TEXTS.items()
+        }
+    except Exception as e:
+        # Offline without a cached encoding: fall back to a character count (an upper bound for Japanese)
+        print(f"⚠️  tiktokenでトークン数を計算できないため文字数で概算します: {e}")
+        return {
+            test_name: sum(len(text) for text in texts)
+            for test_name, texts in FIXTURE_TEXTS.items()
+        }
+
+def estimate_test_costs(use_batch_api: bool = False) -> Dict[str, Any]:
     """Estimate the cost of running integration tests
     
+    Args:
+        use_batch_api: Estimate for the Batch API (half the synchronous price)
+    
     Returns:
         Dictionary with cost estimation details
     """
-    # Estimated token usage for each test
-    test_estimates = {
-        "test_single_japanese_text_embedding": 25,
-        "test_multiple_recipe_texts_embedding": 60,
-        "test_embedding_similarity_calculation": 50,
-        "test_long_text_handling": 200,  # Long text test
-        "test_empty_and_edge_cases": 5,
-        "test_model_consistency": 20,
-        "test_batch_processing_performance": 100  # 20 texts
-    }
+    # Token usage for each test, counted locally from the fixture texts
+    test_estimates = count_fixture_tokens()
     
     total_tokens = sum(test_estimates.values())
     cost_per_1k_tokens = 0.00002  # USD for text-embedding-3-small
+    if use_batch_api:
+        cost_per_1k_tokens /= 2  # Batch API is billed at 50%
     estimated_cost = total_tokens / 1000 * cost_per_1k_tokens
     
     return {
@@ -50,13 +80,23 @@ def estimate_test_costs() -> Dict[str, Any]:
         "test_breakdown": test_estimates
     }
 
-def show_cost_warning() -> bool:
+def _costs_confirmed_by_env() -> bool:
+    """Check whether CONFIRM_COSTS accepts the API costs"""
+    return os.getenv('CONFIRM_COSTS', '').strip().lower() in ['y', 'yes', '1', 'true']
+
+def show_cost_warning(use_batch_api: bool = False) -> bool:
     """Show cost warning and get user confirmation
     
+    Confirmation comes from the CONFIRM_COSTS environment variable when it is
+    set or when stdin is not a terminal (CI); otherwise the user is prompted.
+    
+    Args:
+        use_batch_api: Show the estimate for the Batch API
+    
     Returns:
         True if user confirms, False otherwise
     """
-    cost_info = estimate_test_costs()
+    cost_info = estimate_test_costs(use_batch_api)
     
     print("=" * 60)
     print("⚠️  OpenAI API統合テスト実行前の警告")
@@ -78,6 +118,8 @@ def show_cost_warning() -> bool:
     print("   • 実際のコストは入力テキストの長さにより変動します")
     print("   • ネットワーク状況により予想より時間がかかる場合があります")
     print("   • APIエラーが発生した場合も一部料金が発生する可能性があります")
+    if use_batch_api:
+        print("   • Batch APIは完了まで最大24時間かかる場合があります")
     print()
     
     # Check if API key is available
@@ -96,6 +138,14 @@ def show_cost_warning() -> bool:
     print()
     print("=" * 60)
     
+    if os.getenv('CONFIRM_COSTS') is not None or not sys.stdin.isatty():
+        if _costs_confirmed_by_env():
+            print("\n✓ CONFIRM_COSTSにより承認済み。テスト実行を開始します...\n")
+            return True
+        print("\n❌ テスト実行をキャンセルしました")
+        print("   CONFIRM_COSTS=yes を設定するか、端末から実行して確認に答えてください")
+        return False
+    
     while True:
         response = input("テストを実行しますか？ (y/N): ").strip().lower()
         if response in ['y', 'yes', 'はい']:
@@ -107,28 +157,168 @@ def show_cost_warning() -> bool:
         else:
             print("'y' (はい) または 'n' (いいえ) で答えてください")
 
-def run_integration_tests(skip_confirmation: bool = False, estimate_only: bool = False) -> bool:
+def prefetch_batch_embeddings(test_module) -> None:
+    """Fetch embeddings for all integration tests in one Batch API job
+    
+    Args:
+        test_module: Loaded integration test module
+    """
+    from apps.embedding.client.openai_client import OpenAIEmbeddingClient
+    from apps.embedding.config.embedding_config import EmbeddingConfig
+    from tests.embedding.integration_fixtures import FIXTURE_TEXTS
+    
+    test_class = test_module.TestOpenAIEmbeddingIntegration
+    client = OpenAIEmbeddingClient(EmbeddingConfig.from_environment())
+    
+    print("⏳ Batch APIで埋め込みを取得しています（完了まで時間がかかる場合があります）...")
+    test_class._batch_results = client.get_embeddings_batch(FIXTURE_TEXTS)
+    print()
+
+class StreamingResult(unittest.TextTestResult):
+    """TextTestResult that writes tracebacks to a log file as they occur
+    
+    failures/errors keep only a pointer to the log instead of the full
+    traceback text, so memory does not grow with traceback length.
+    """
+    
+    def __init__(self, stream, descriptions, verbosity, *, log_file: TextIO, **kwargs):
+        super().__init__(stream, descriptions, verbosity, **kwargs)
+        self.log_file = log_file
+        self.log_note = f"see {getattr(log_file, 'name', 'failure log')}"
+    
+    def _spill(self, kind: str, entries: list, start: int) -> None:
+        """Move tracebacks added since start from entries to the log file"""
+        for i in range(start, len(entries)):
+            test, traceback = entries[i]
+            self.log_file.write(f"{kind}: {test.id()}\n{traceback}\n")
+            entries[i] = (test, self.log_note)
+        self.log_file.flush()
+    
+    def addError(self, test, err):
+        start = len(self.errors)
+        super().addError(test, err)
+        self._spill("ERROR", self.errors, start)
+    
+    def addFailure(self, test, err):
+        start = len(self.failures)
+        super().addFailure(test, err)
+        self._spill("FAIL", self.failures, start)
+    
+    def addSubTest(self, test, subtest, err):
+        failures_start, errors_start = len(self.failures), len(self.errors)
+        super().addSubTest(test, subtest, err)
+        self._spill("FAIL", self.failures, failures_start)
+        self._spill("ERROR", self.errors, errors_start)
+
+def _iter_test_cases(suite: unittest.TestSuite):
+    """Flatten a loaded suite into individual test cases"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_test_cases(test)
+        else:
+            yield test
+
+async def run_tests_concurrently(suite: unittest.TestSuite, concurrency: int,
+                                 log_file: TextIO) -> unittest.TestResult:
+    """Run test methods concurrently to overlap API round trips
+    
+    Test methods are blocking, so each one runs in a worker thread and an
+    asyncio.Semaphore caps how many are in flight (to respect rate limits).
+    Class fixtures (setUpClass/tearDownClass) run once per class around them.
+    
+    Args:
+        suite: Loaded test suite
+        concurrency: Maximum number of tests running at once
+        log_file: File that receives the tracebacks of failed tests
+        
+    Returns:
+        Combined test result
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    
+    result = unittest.TestResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    
+    tests_by_class: Dict[type, List[unittest.TestCase]] = {}
+    for test in _iter_test_cases(suite):
+        tests_by_class.setdefault(type(test), []).append(test)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run_one(test: unittest.TestCase) -> unittest.TestResult:
+            async with semaphore:
+                test_result = StreamingResult(sys.stdout, True, 0, log_file=log_file)
+                await loop.run_in_executor(executor, test, test_result)
+                return test_result
+        
+        for test_class, tests in tests_by_class.items():
+            try:
+                test_class.setUpClass()
+            except unittest.SkipTest as e:
+                print(f"setUpClass ({test_class.__name__}) ... skipped '{e}'")
+                result.skipped.extend((test, str(e)) for test in tests)
+                continue
+            
+            test_results = await asyncio.gather(*(run_one(test) for test in tests))
+            
+            for test, test_result in zip(tests, test_results):
+                if test_result.failures:
+                    status = "FAIL"
+                elif test_result.errors:
+                    status = "ERROR"
+                elif test_result.skipped:
+                    status = "skipped"
+                else:
+                    status = "ok"
+                print(f"{test} ... {status}")
+                
+                result.testsRun += test_result.testsRun
+                result.failures.extend(test_result.failures)
+                result.errors.extend(test_result.errors)
+                result.skipped.extend(test_result.skipped)
+            
+            test_class.tearDownClass()
+    
+    return result
+
+def run_integration_tests(skip_confirmation: bool = False, estimate_only: bool = False,
+                          use_batch_api: bool = False, concurrency: int = 1,
+                          max_cost_usd: Optional[float] = None,
+                          failure_log: Path = DEFAULT_FAILURE_LOG) -> bool:
     """Run integration tests with cost warnings
     
     Args:
         skip_confirmation: Skip cost confirmation dialog
         estimate_only: Show cost estimate only, don't run tests
+        use_batch_api: Fetch all embeddings through the Batch API before running tests
+        concurrency: Number of tests run at once (1 runs them serially)
+        max_cost_usd: Fail before any API call if the estimate exceeds this budget
+        failure_log: File that receives the tracebacks of failed tests
         
     Returns:
         True if tests pass, False otherwise
     """
-    if estimate_only:
-        cost_info = estimate_test_costs()
-        print("=== OpenAI API統合テスト コスト見積もり ===")
-        print(f"推定総トークン数: {cost_info['total_estimated_tokens']:,}")
-        print(f"推定コスト: ${cost_info['estimated_cost_usd']:.6f} USD")
-        return True
+    if estimate_only or max_cost_usd is not None:
+        cost_info = estimate_test_costs(use_batch_api)
+        
+        if estimate_only:
+            print("=== OpenAI API統合テスト コスト見積もり ===")
+            print(f"推定総トークン数: {cost_info['total_estimated_tokens']:,}")
+            print(f"推定コスト: ${cost_info['estimated_cost_usd']:.6f} USD")
+        
+        if max_cost_usd is not None and cost_info['estimated_cost_usd'] > max_cost_usd:
+            print(f"❌ 推定コスト ${cost_info['estimated_cost_usd']:.6f} USD が上限 ${max_cost_usd:.6f} USD を超えています")
+            return False
+        
+        if estimate_only:
+            return True
     
     print("=== OpenAI API統合テスト ===\n")
     
     # Show cost warning unless skipped
     if not skip_confirmation:
-        if not show_cost_warning():
+        if not show_cost_warning(use_batch_api):
             return False
     
     # Check API key availability
@@ -146,15 +336,23 @@ def run_integration_tests(skip_confirmation: bool = False, estimate_only: bool =
             print(f"❌ 統合テストファイルが見つかりません: {integration_test_file}")
             return False
         
-        suite = loader.loadTestsFromName('test_openai_integration', 
-                                       module=None)
+        # Imported here so --estimate-only does not load the OpenAI client
+        from tests.embedding import test_openai_integration
+        suite = loader.loadTestsFromModule(test_openai_integration)
         
-        # Import the module manually
-        spec = __import__('tests.embedding.test_openai_integration', fromlist=[''])
-        suite = loader.loadTestsFromModule(spec)
+        if use_batch_api:
+            prefetch_batch_embeddings(test_openai_integration)
         
-        runner = unittest.TextTestRunner(verbosity=2, stream=sys.stdout)
-        result = runner.run(suite)
+        with open(failure_log, 'w', encoding='utf-8') as log_file:
+            if concurrency > 1:
+                import asyncio
+                result = asyncio.run(run_tests_concurrently(suite, concurrency, log_file))
+            else:
+                runner = unittest.TextTestRunner(
+                    verbosity=2, stream=sys.stdout,
+                    resultclass=partial(StreamingResult, log_file=log_file)
+                )
+                result = runner.run(suite)
         
         # Print results summary
         print(f"\n=== 統合テスト結果サマリー ===")
@@ -173,6 +371,9 @@ def run_integration_tests(skip_confirmation: bool = False, estimate_only: bool =
             for test, traceback in result.errors:
                 print(f"  - {test}")
         
+        if result.failures or result.errors:
+            print(f"\nトレースバック: {failure_log}")
+        
         success = len(result.failures) == 0 and len(result.errors) == 0
         print(f"\n{'✓' if success else '✗'} 統合テスト{'成功' if success else '失敗'}")
         
@@ -193,9 +394,16 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 例:
-  python run_embedding_integration_tests.py                    # 通常実行（確認あり）
+  python run_embedding_integration_tests.py                    # 通常実行（端末では確認あり）
+  CONFIRM_COSTS=yes python run_embedding_integration_tests.py  # 環境変数でコストを承認して実行（CI向け）
   python run_embedding_integration_tests.py --skip-confirmation # 確認スキップ
   python run_embedding_integration_tests.py --estimate-only    # 見積もりのみ表示
+  python run_embedding_integration_tests.py --batch            # Batch APIで実行（半額、低速）
+  python run_embedding_integration_tests.py --concurrency 5    # 最大5テストを並行実行
+  python run_embedding_integration_tests.py --estimate-only --max-cost 0.001  # 予算超過なら失敗
+  python run_embedding_integration_tests.py --failure-log out.log  # トレースバックの出力先
+
+端末以外（CIなど）から実行する場合は確認を行わず、CONFIRM_COSTS=yes が設定されていなければ実行を中止します。
         """
     )
     
@@ -211,11 +419,42 @@ def main():
         help='コスト見積もりのみ表示してテストは実行しない'
     )
     
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Batch APIで埋め込みをまとめて取得（料金半額、完了まで最大24時間）'
+    )
+    
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=1,
+        help='同時に実行するテスト数（デフォルト: 1 = 逐次実行）'
+    )
+    
+    parser.add_argument(
+        '--max-cost',
+        type=float,
+        default=None,
+        help='推定コスト（USD）の上限。超える場合はAPIを呼び出す前に失敗する'
+    )
+    
+    parser.add_argument(
+        '--failure-log',
+        type=Path,
+        default=DEFAULT_FAILURE_LOG,
+        help=f'失敗したテストのトレースバックの出力先（デフォルト: {DEFAULT_FAILURE_LOG}）'
+    )
+    
     args = parser.parse_args()
     
     success = run_integration_tests(
         skip_confirmation=args.skip_confirmation,
-        estimate_only=args.estimate_only
+        estimate_only=args.estimate_only,
+        use_batch_api=args.batch,
+        concurrency=args.concurrency,
+        max_cost_usd=args.max_cost,
+        failure_log=args.failure_log
     )
     
     if not success:
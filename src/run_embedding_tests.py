@@ -1,50 +1,122 @@
 #!/usr/bin/env python3
 """Test runner for embedding module
 
+Test classes are run in parallel worker processes.
+
 Usage:
     python run_embedding_tests.py
+    python run_embedding_tests.py -j 4   # Number of worker processes
 """
 
+import io
+import os
 import sys
+import argparse
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Add current directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-def run_embedding_tests():
-    """Run all embedding module tests"""
+
+def _iter_test_cases(suite: unittest.TestSuite) -> Iterator[unittest.TestCase]:
+    """Flatten a discovered suite into individual test cases"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_test_cases(test)
+        else:
+            yield test
+
+
+def _run_test_group(test_ids: List[str]) -> Tuple[int, List[str], List[str], str]:
+    """Run one test class in a worker process
+    
+    Args:
+        test_ids: Test ids belonging to a single TestCase class
+    
+    Returns:
+        (tests run, failed test names, errored test names, runner output)
+    """
+    stream = io.StringIO()
+    suite = unittest.TestLoader().loadTestsFromNames(test_ids)
+    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    
+    failures = [str(test) for test, _ in result.failures]
+    errors = [str(test) for test, _ in result.errors]
+    return result.testsRun, failures, errors, stream.getvalue()
+
+
+def run_embedding_tests(workers: Optional[int] = None):
+    """Run all embedding module tests
+    
+    Args:
+        workers: Number of worker processes (defaults to the CPU count)
+    """
     print("=== 埋め込みモジュールテスト実行 ===\n")
     
-    # Discover and run tests
+    # Discover tests with the src directory as top level so workers can import them by id
     loader = unittest.TestLoader()
-    start_dir = Path(__file__).parent / 'tests' / 'embedding'
-    suite = loader.discover(str(start_dir), pattern='test_*.py')
+    top_level_dir = Path(__file__).parent
+    start_dir = top_level_dir / 'tests' / 'embedding'
+    suite = loader.discover(str(start_dir), pattern='test_*.py', top_level_dir=str(top_level_dir))
+    
+    # Group by TestCase class so setUpClass fixtures run once per class
+    groups: Dict[str, List[str]] = {}
+    import_failures = unittest.TestSuite()
+    for test in _iter_test_cases(suite):
+        if type(test).__module__ == 'unittest.loader':
+            # Modules that failed to import cannot be reloaded by id in a worker
+            import_failures.addTest(test)
+        else:
+            groups.setdefault(f"{type(test).__module__}.{type(test).__qualname__}", []).append(test.id())
     
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    tests_run = 0
+    failures: List[str] = []
+    errors: List[str] = []
+    
+    if groups:
+        max_workers = min(workers or os.cpu_count() or 1, len(groups))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for group_run, group_failures, group_errors, output in executor.map(_run_test_group, groups.values()):
+                print(output, end="")
+                tests_run += group_run
+                failures.extend(group_failures)
+                errors.extend(group_errors)
+    
+    if import_failures.countTestCases():
+        result = unittest.TextTestRunner(verbosity=2).run(import_failures)
+        tests_run += result.testsRun
+        failures.extend(str(test) for test, _ in result.failures)
+        errors.extend(str(test) for test, _ in result.errors)
     
     # Print results summary
     print(f"\n=== テスト結果サマリー ===")
-    print(f"実行テスト数: {result.testsRun}")
-    print(f"失敗: {len(result.failures)}")
-    print(f"エラー: {len(result.errors)}")
+    print(f"実行テスト数: {tests_run}")
+    print(f"失敗: {len(failures)}")
+    print(f"エラー: {len(errors)}")
     
-    if result.failures:
+    if failures:
         print("\n失敗したテスト:")
-        for test, traceback in result.failures:
+        for test in failures:
             print(f"  - {test}")
     
-    if result.errors:
+    if errors:
         print("\nエラーが発生したテスト:")
-        for test, traceback in result.errors:
+        for test in errors:
             print(f"  - {test}")
     
-    success = len(result.failures) == 0 and len(result.errors) == 0
+    success = len(failures) == 0 and len(errors) == 0
     print(f"\n{'✓' if success else '✗'} テスト{'成功' if success else '失敗'}")
     
     return success
 
 if __name__ == "__main__":
-    success = run_embedding_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run embedding module tests")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    success = run_embedding_tests(args.workers)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,53 @@
+"""Input texts for the OpenAI integration tests.
+
+Single source of truth for the texts each test embeds. The integration
+runner uses FIXTURE_TEXTS for cost estimates and the Batch API prefetch,
+so this module must not import the OpenAI client.
+"""
+from typing import Dict, List
+
+
+SINGLE_TEXT = "これは日本語のテスト用レシピです。卵と醤油を使った料理の説明文。"
+
+RECIPE_TEXTS = [
+    "卵白2個とうに小さじ1を使った金糸卵のレシピ",
+    "醤油ベースの煮物料理、野菜と肉を柔らかく煮込む",
+    "甘いお菓子作り、砂糖と小麦粉を主材料とする",
+    "Modern Japanese cooking with traditional ingredients",
+    "Fresh seafood preparation with soy sauce marinade"
+]
+
+# Base text, a similar text and a different text (the base is embedded once)
+SIMILARITY_TEXTS = [
+    "卵を使った料理のレシピ",
+    "たまご料理の作り方",
+    "魚を焼いた料理の説明"
+]
+
+LONG_RECIPE_TEXT = """
+江戸時代の金糸卵というレシピについて詳しく説明します。
+この料理は卵白を主材料とし、金箔の代わりにウニを使用する現代的なアレンジが施されています。
+手順としては、まず卵白をきれいに濾し、その後でウニを少量加えてよく混ぜ合わせます。
+平鍋で湯を沸かし、湯煎にかけながらゆっくりと固めていくのがポイントです。
+この調理法により、滑らかで上品な食感を持つ料理が完成します。
+江戸時代の人々にとって、このような料理は特別な日のご馳走でした。
+現代でも高級料亭などで提供されることがある、歴史ある日本料理の一つです。
+""" * 3  # Make it longer
+
+SHORT_TEXT = "卵"
+
+CONSISTENCY_TEXT = "一貫性テスト用のレシピテキスト"
+
+BATCH_TEXTS = [f"レシピ{i}: 材料と調理法の説明文" for i in range(20)]
+
+
+# Texts embedded by each test (test method name -> inputs, in request order)
+FIXTURE_TEXTS: Dict[str, List[str]] = {
+    "test_single_japanese_text_embedding": [SINGLE_TEXT],
+    "test_multiple_recipe_texts_embedding": RECIPE_TEXTS,
+    "test_embedding_similarity_calculation": SIMILARITY_TEXTS,
+    "test_long_text_handling": [LONG_RECIPE_TEXT],
+    "test_empty_and_edge_cases": [SHORT_TEXT],
+    "test_model_consistency": [CONSISTENCY_TEXT, CONSISTENCY_TEXT],
+    "test_batch_processing_performance": BATCH_TEXTS,
+}
@@ -1,3 +1,4 @@
+import json
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import pytest
@@ -9,12 +10,28 @@ from apps.embedding.client.openai_client import OpenAIEmbeddingClient
 from apps.embedding.config.embedding_config import EmbeddingConfig
 
 
+# (EmbeddingConfig kwargs, expected error message) for invalid configurations
+CONFIG_VALIDATION_FAILURE_CASES = (
+    # Invalid API key
+    ({"openai_api_key": "invalid-key"}, "Invalid OpenAI API key"),
+    # Invalid dimensions
+    ({"openai_api_key": "sk-valid", "embedding_dimensions": -1}, "Embedding dimensions"),
+    # Invalid batch size
+    ({"openai_api_key": "sk-valid", "batch_size": 0}, "Batch size"),
+    # Invalid retry attempts
+    ({"openai_api_key": "sk-valid", "retry_attempts": -1}, "Retry attempts"),
+    # Invalid retry delay
+    ({"openai_api_key": "sk-valid", "retry_delay": -1.0}, "Retry delay")
+)
+
+
 class TestOpenAIEmbeddingClient(unittest.TestCase):
     """Test cases for OpenAIEmbeddingClient"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.test_config = EmbeddingConfig(
+    @classmethod
+    def setUpClass(cls):
+        """Set up read-only fixtures shared by all tests"""
+        cls.test_config = EmbeddingConfig(
             openai_api_key="sk-test-key-123456789",
             embedding_model="text-embedding-3-small",
             embedding_dimensions=1536,
@@ -23,30 +40,36 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
             retry_delay=1.0
         )
         
-        self.sample_texts = [
+        cls.sample_texts = [
             "これは日本語のテストテキストです",
             "This is English test text",
             "材料: 卵白2個、うに小さじ1"
         ]
         
         # Mock embedding response (1536 dimensions)
-        self.mock_embedding = [0.1] * 1536
+        cls.mock_embedding = [0.1] * 1536
         
         # Mock OpenAI response structure
-        self.mock_response = Mock()
-        self.mock_response.data = []
-        for _ in range(len(self.sample_texts)):
+        cls.mock_response = Mock()
+        cls.mock_response.data = []
+        for _ in range(len(cls.sample_texts)):
             mock_data = Mock()
-            mock_data.embedding = self.mock_embedding.copy()
-            self.mock_response.data.append(mock_data)
+            mock_data.embedding = cls.mock_embedding
+            cls.mock_response.data.append(mock_data)
+    
+    def setUp(self):
+        """Set up per-test mocks"""
+        # Patch the OpenAI client class for every test
+        patcher = patch('apps.embedding.client.openai_client.OpenAI')
+        self.mock_openai_class = patcher.start()
+        self.addCleanup(patcher.stop)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_init_success(self, mock_openai_class):
+    def test_init_success(self):
         """Test successful client initialization"""
         client = OpenAIEmbeddingClient(self.test_config)
         
         self.assertEqual(client.config, self.test_config)
-        mock_openai_class.assert_called_once_with(api_key="sk-test-key-123456789")
+        self.mock_openai_class.assert_called_once_with(api_key="sk-test-key-123456789")
     
     def test_init_invalid_config(self):
         """Test initialization with invalid configuration"""
@@ -58,12 +81,11 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         with self.assertRaises(ValueError):
             OpenAIEmbeddingClient(invalid_config)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_get_embeddings_sync_success(self, mock_openai_class):
+    def test_get_embeddings_sync_success(self):
         """Test successful synchronous embedding generation"""
         # Setup mock
         mock_client_instance = Mock()
-        mock_openai_class.return_value = mock_client_instance
+        self.mock_openai_class.return_value = mock_client_instance
         mock_client_instance.embeddings.create.return_value = self.mock_response
         
         # Test execution
@@ -80,8 +102,7 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
             input=self.sample_texts
         )
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_get_embeddings_sync_empty_input(self, mock_openai_class):
+    def test_get_embeddings_sync_empty_input(self):
         """Test embedding generation with empty input"""
         client = OpenAIEmbeddingClient(self.test_config)
         
@@ -90,12 +111,11 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         
         self.assertIn("テキストリストが空です", str(context.exception))
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_get_single_embedding_success(self, mock_openai_class):
+    def test_get_single_embedding_success(self):
         """Test successful single embedding generation"""
         # Setup mock
         mock_client_instance = Mock()
-        mock_openai_class.return_value = mock_client_instance
+        self.mock_openai_class.return_value = mock_client_instance
         
         single_response = Mock()
         single_data = Mock()
@@ -111,8 +131,7 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         self.assertEqual(len(result), 1536)
         self.assertListEqual(result, self.mock_embedding)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_get_single_embedding_empty_text(self, mock_openai_class):
+    def test_get_single_embedding_empty_text(self):
         """Test single embedding generation with empty text"""
         client = OpenAIEmbeddingClient(self.test_config)
         
@@ -124,14 +143,13 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         with self.assertRaises(ValueError):
             client.get_single_embedding("   ")  # Only whitespace
     
-    @patch('apps.embedding.client.openai_client.OpenAI')  
-    def test_api_error_handling(self, mock_openai_class):
+    def test_api_error_handling(self):
         """Test API error handling with different status codes"""
         import openai
         from unittest.mock import Mock
         
         mock_client_instance = Mock()
-        mock_openai_class.return_value = mock_client_instance
+        self.mock_openai_class.return_value = mock_client_instance
         
         # Test different API errors
         test_cases = [
@@ -160,8 +178,7 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
                     print_args = str(mock_print.call_args)
                     self.assertIn("✗", print_args)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_calculate_token_count(self, mock_openai_class):
+    def test_calculate_token_count(self):
         """Test token count calculation"""
         client = OpenAIEmbeddingClient(self.test_config)
         
@@ -172,8 +189,7 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         self.assertIsInstance(token_count, int)
         self.assertGreater(token_count, 0)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_validate_embedding_dimensions(self, mock_openai_class):
+    def test_validate_embedding_dimensions(self):
         """Test embedding dimensions validation"""
         client = OpenAIEmbeddingClient(self.test_config)
         
@@ -185,8 +201,7 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         invalid_embedding = [0.1] * 512
         self.assertFalse(client.validate_embedding_dimensions(invalid_embedding))
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_get_model_info(self, mock_openai_class):
+    def test_get_model_info(self):
         """Test model information retrieval"""
         client = OpenAIEmbeddingClient(self.test_config)
         model_info = client.get_model_info()
@@ -198,12 +213,11 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         self.assertEqual(model_info["model"], "text-embedding-3-small")
         self.assertEqual(model_info["dimensions"], 1536)
     
-    @patch('apps.embedding.client.openai_client.OpenAI')
-    def test_async_embeddings(self, mock_openai_class):
+    def test_async_embeddings(self):
         """Test asynchronous embedding generation"""
         # Setup mock
         mock_client_instance = Mock()
-        mock_openai_class.return_value = mock_client_instance
+        self.mock_openai_class.return_value = mock_client_instance
         mock_client_instance.embeddings.create.return_value = self.mock_response
         
         client = OpenAIEmbeddingClient(self.test_config)
@@ -217,6 +231,45 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
         # Run async test
         asyncio.run(run_async_test())
 
+    def test_get_embeddings_batch_success(self):
+        """Test embedding generation through the Batch API"""
+        # Setup mock
+        mock_client_instance = Mock()
+        self.mock_openai_class.return_value = mock_client_instance
+        mock_client_instance.files.create.return_value = Mock(id="file-input")
+        mock_client_instance.batches.create.return_value = Mock(
+            id="batch-1", status="completed", output_file_id="file-output"
+        )
+        
+        output_lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "response": {"status_code": 200, "body": {"data": [
+                    {"index": i, "embedding": self.mock_embedding} for i in range(count)
+                ]}},
+                "error": None
+            })
+            for custom_id, count in (("first", 1), ("second", 2))
+        ]
+        mock_client_instance.files.content.return_value = Mock(text="\n".join(output_lines))
+        
+        client = OpenAIEmbeddingClient(self.test_config)
+        result = client.get_embeddings_batch({
+            "first": self.sample_texts[:1],
+            "second": self.sample_texts[1:]
+        })
+        
+        # Assertions
+        self.assertEqual(len(result["first"]), 1)
+        self.assertEqual(len(result["second"]), 2)
+        self.assertListEqual(result["second"][1], self.mock_embedding)
+        
+        mock_client_instance.batches.create.assert_called_once_with(
+            input_file_id="file-input",
+            endpoint="/v1/embeddings",
+            completion_window="24h"
+        )
+
 
 class TestEmbeddingConfig(unittest.TestCase):
     """Test cases for EmbeddingConfig"""
@@ -259,27 +312,14 @@ class TestEmbeddingConfig(unittest.TestCase):
     
     def test_config_validation_failures(self):
         """Test configuration validation failures"""
-        test_cases = [
-            # Invalid API key
-            {"openai_api_key": "invalid-key", "expected_error": "Invalid OpenAI API key"},
-            # Invalid dimensions
-            {"openai_api_key": "sk-valid", "embedding_dimensions": -1, "expected_error": "Embedding dimensions"},
-            # Invalid batch size
-            {"openai_api_key": "sk-valid", "batch_size": 0, "expected_error": "Batch size"},
-            # Invalid retry attempts
-            {"openai_api_key": "sk-valid", "retry_attempts": -1, "expected_error": "Retry attempts"},
-            # Invalid retry delay
-            {"openai_api_key": "sk-valid", "retry_delay": -1.0, "expected_error": "Retry delay"}
-        ]
-        
-        for case in test_cases:
-            with self.subTest(case=case):
-                config = EmbeddingConfig(**{k: v for k, v in case.items() if k != "expected_error"})
+        for config_kwargs, expected_error in CONFIG_VALIDATION_FAILURE_CASES:
+            with self.subTest(config=config_kwargs):
+                config = EmbeddingConfig(**config_kwargs)
                 
                 with self.assertRaises(ValueError) as context:
                     config.validate()
                 
-                self.assertIn(case["expected_error"], str(context.exception))
+                self.assertIn(expected_error, str(context.exception))
     
     def test_config_str_representation(self):
         """Test configuration string representation (API key should be hidden)"""
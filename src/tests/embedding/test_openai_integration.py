@@ -1,19 +1,81 @@
 import unittest
 import os
+import json
+import math
 import time
-from typing import List, Dict
+import hashlib
+import operator
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
 
 # Test target
 from apps.embedding.client.openai_client import OpenAIEmbeddingClient
 from apps.embedding.config.embedding_config import EmbeddingConfig
+from tests.embedding.integration_fixtures import (
+    SINGLE_TEXT, RECIPE_TEXTS, SIMILARITY_TEXTS, LONG_RECIPE_TEXT,
+    SHORT_TEXT, CONSISTENCY_TEXT, BATCH_TEXTS
+)
+
+
+class EmbeddingFileCache:
+    """File-backed embedding cache so re-runs skip paid API calls
+    
+    Each embedding is stored as a JSON file named by sha256(model|text).
+    """
+    
+    def __init__(self, cache_dir: Path, model: str, ttl_hours: int):
+        """Initialize the cache
+        
+        Args:
+            cache_dir: Directory holding the cached embeddings
+            model: Embedding model name (part of the cache key)
+            ttl_hours: Hours before a cached embedding expires (0 or less never expires)
+        """
+        self.cache_dir = cache_dir
+        self.model = model
+        self.ttl_seconds = ttl_hours * 3600
+    
+    def _path(self, text: str) -> Path:
+        key = hashlib.sha256(f"{self.model}|{text}".encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding, or None on a miss or expired entry"""
+        path = self._path(text)
+        try:
+            if self.ttl_seconds > 0 and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+    
+    def set(self, text: str, embedding: List[float]) -> None:
+        """Store an embedding (written atomically)"""
+        path = self._path(text)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(embedding), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  埋め込みキャッシュの保存に失敗しました: {e}")
 
 
 class TestOpenAIEmbeddingIntegration(unittest.TestCase):
     """Integration tests using real OpenAI API
     
     WARNING: These tests make actual API calls and will incur costs!
+    
+    When the runner is started with --batch, embeddings for every test are
+    fetched up front in one Batch API job and stored in _batch_results.
+    Otherwise embeddings are cached on disk (EMBEDDING_TEST_CACHE_DIR,
+    default ~/.cache/embedding_tests) when EMBEDDING_CACHE_ENABLED is true.
     """
     
+    # Embeddings prefetched through the Batch API (test method name -> vectors)
+    _batch_results: Dict[str, List[List[float]]] = {}
+    
     @classmethod
     def setUpClass(cls):
         """Set up integration test environment"""
@@ -29,6 +91,11 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
         cls.client = OpenAIEmbeddingClient(cls.config)
         cls.test_costs = []  # Track estimated costs
         
+        cls.cache = None
+        if cls.config.cache_enabled:
+            cache_dir = Path(os.getenv('EMBEDDING_TEST_CACHE_DIR', '~/.cache/embedding_tests')).expanduser()
+            cls.cache = EmbeddingFileCache(cache_dir, cls.config.embedding_model, cls.config.cache_ttl_hours)
+        
         print(f"✓ 統合テスト開始 - モデル: {cls.config.embedding_model}")
     
     @classmethod
@@ -36,47 +103,84 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
         """Clean up and show cost summary"""
         if hasattr(cls, 'test_costs') and cls.test_costs:
             total_tokens = sum(cls.test_costs)
-            estimated_cost = total_tokens / 1000 * 0.00002  # $0.00002 per 1K tokens for text-embedding-3-small
+            # $0.00002 per 1K tokens for text-embedding-3-small (half price via the Batch API)
+            cost_per_1k_tokens = 0.00001 if cls._batch_results else 0.00002
+            estimated_cost = total_tokens / 1000 * cost_per_1k_tokens
             print(f"\n=== API使用量サマリー ===")
             print(f"総使用トークン数: {total_tokens:,}")
             print(f"推定コスト: ${estimated_cost:.6f} USD")
     
+    def setUp(self):
+        """Reset the texts sent to the API by this test"""
+        self._api_texts: List[str] = []
+    
+    def _record_cost(self) -> None:
+        """Record tokens actually billed by this test (0 when fully cached)"""
+        self.test_costs.append(self.client._calculate_token_count(self._api_texts))
+    
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings for texts from the Batch API results, the disk cache or the API"""
+        if self._testMethodName in self._batch_results:
+            self._api_texts.extend(texts)
+            return self._batch_results[self._testMethodName]
+        
+        embeddings = [self.cache.get(text) if self.cache else None for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fetched = self.client.get_embeddings_sync([texts[i] for i in missing])
+            for i, embedding in zip(missing, fetched):
+                embeddings[i] = embedding
+                if self.cache:
+                    self.cache.set(texts[i], embedding)
+            self._api_texts.extend(texts[i] for i in missing)
+        
+        return embeddings
+    
+    def _get_single_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """Get embedding for a single text from the Batch API results, the disk cache or the API"""
+        if self._testMethodName in self._batch_results:
+            self._api_texts.append(text)
+            return self._batch_results[self._testMethodName][0]
+        
+        if use_cache and self.cache:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+        
+        embedding = self.client.get_single_embedding(text)
+        self._api_texts.append(text)
+        if use_cache and self.cache:
+            self.cache.set(text, embedding)
+        return embedding
+    
     def test_single_japanese_text_embedding(self):
         """Test embedding generation for single Japanese text"""
-        test_text = "これは日本語のテスト用レシピです。卵と醤油を使った料理の説明文。"
+        test_text = SINGLE_TEXT
         
         start_time = time.time()
-        embedding = self.client.get_single_embedding(test_text)
+        embedding = self._get_single_embedding(test_text)
         duration = time.time() - start_time
         
         # Record cost tracking
-        token_count = self.client._calculate_token_count([test_text])
-        self.test_costs.append(token_count)
+        self._record_cost()
         
         # Assertions
         self.assertEqual(len(embedding), self.config.embedding_dimensions)
         self.assertTrue(all(isinstance(x, float) for x in embedding))
         self.assertTrue(self.client.validate_embedding_dimensions(embedding))
         
-        print(f"✓ 単一日本語テキスト埋め込み完了 ({duration:.2f}秒, {token_count}トークン)")
+        print(f"✓ 単一日本語テキスト埋め込み完了 ({duration:.2f}秒)")
     
     def test_multiple_recipe_texts_embedding(self):
         """Test embedding generation for multiple recipe-like texts"""
-        recipe_texts = [
-            "卵白2個とうに小さじ1を使った金糸卵のレシピ",
-            "醤油ベースの煮物料理、野菜と肉を柔らかく煮込む",
-            "甘いお菓子作り、砂糖と小麦粉を主材料とする",
-            "Modern Japanese cooking with traditional ingredients",
-            "Fresh seafood preparation with soy sauce marinade"
-        ]
+        recipe_texts = RECIPE_TEXTS
         
         start_time = time.time()
-        embeddings = self.client.get_embeddings_sync(recipe_texts)
+        embeddings = self._get_embeddings(recipe_texts)
         duration = time.time() - start_time
         
         # Record cost tracking
-        token_count = self.client._calculate_token_count(recipe_texts)
-        self.test_costs.append(token_count)
+        self._record_cost()
         
         # Assertions
         self.assertEqual(len(embeddings), len(recipe_texts))
@@ -84,34 +188,19 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
             self.assertEqual(len(embedding), self.config.embedding_dimensions)
             self.assertTrue(self.client.validate_embedding_dimensions(embedding))
         
-        print(f"✓ 複数レシピテキスト埋め込み完了 ({duration:.2f}秒, {token_count}トークン)")
+        print(f"✓ 複数レシピテキスト埋め込み完了 ({duration:.2f}秒)")
     
     def test_embedding_similarity_calculation(self):
         """Test semantic similarity between related texts"""
-        similar_texts = [
-            "卵を使った料理のレシピ",
-            "たまご料理の作り方",
-        ]
-        
-        different_texts = [
-            "卵を使った料理のレシピ", 
-            "魚を焼いた料理の説明"
-        ]
-        
-        # Get embeddings
-        similar_embeddings = self.client.get_embeddings_sync(similar_texts)
-        different_embeddings = self.client.get_embeddings_sync(different_texts)
+        # Get embeddings (base, similar and different text in one request)
+        base_embedding, similar_embedding, different_embedding = self._get_embeddings(SIMILARITY_TEXTS)
         
         # Record costs
-        total_token_count = (
-            self.client._calculate_token_count(similar_texts) +
-            self.client._calculate_token_count(different_texts)
-        )
-        self.test_costs.append(total_token_count)
+        self._record_cost()
         
         # Calculate similarities (cosine similarity)
-        similar_similarity = self._cosine_similarity(similar_embeddings[0], similar_embeddings[1])
-        different_similarity = self._cosine_similarity(different_embeddings[0], different_embeddings[1])
+        similar_similarity = self._cosine_similarity(base_embedding, similar_embedding)
+        different_similarity = self._cosine_similarity(base_embedding, different_embedding)
         
         # Assertions
         self.assertGreater(similar_similarity, different_similarity,
@@ -124,29 +213,20 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
     
     def test_long_text_handling(self):
         """Test embedding generation for longer texts"""
-        long_recipe_text = """
-        江戸時代の金糸卵というレシピについて詳しく説明します。
-        この料理は卵白を主材料とし、金箔の代わりにウニを使用する現代的なアレンジが施されています。
-        手順としては、まず卵白をきれいに濾し、その後でウニを少量加えてよく混ぜ合わせます。
-        平鍋で湯を沸かし、湯煎にかけながらゆっくりと固めていくのがポイントです。
-        この調理法により、滑らかで上品な食感を持つ料理が完成します。
-        江戸時代の人々にとって、このような料理は特別な日のご馳走でした。
-        現代でも高級料亭などで提供されることがある、歴史ある日本料理の一つです。
-        """ * 3  # Make it longer
+        long_recipe_text = LONG_RECIPE_TEXT
         
         start_time = time.time()
-        embedding = self.client.get_single_embedding(long_recipe_text)
+        embedding = self._get_single_embedding(long_recipe_text)
         duration = time.time() - start_time
         
         # Record cost tracking
-        token_count = self.client._calculate_token_count([long_recipe_text])
-        self.test_costs.append(token_count)
+        self._record_cost()
         
         # Assertions
         self.assertEqual(len(embedding), self.config.embedding_dimensions)
         self.assertTrue(self.client.validate_embedding_dimensions(embedding))
         
-        print(f"✓ 長文テキスト埋め込み完了 ({duration:.2f}秒, {token_count}トークン)")
+        print(f"✓ 長文テキスト埋め込み完了 ({duration:.2f}秒)")
     
     def test_empty_and_edge_cases(self):
         """Test edge cases and error handling with real API"""
@@ -158,9 +238,8 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
             self.client.get_single_embedding("   ")
         
         # Test very short text
-        short_embedding = self.client.get_single_embedding("卵")
-        token_count = self.client._calculate_token_count(["卵"])
-        self.test_costs.append(token_count)
+        short_embedding = self._get_single_embedding(SHORT_TEXT)
+        self._record_cost()
         
         self.assertEqual(len(short_embedding), self.config.embedding_dimensions)
         
@@ -168,16 +247,19 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
     
     def test_model_consistency(self):
         """Test that same input produces same output (consistency check)"""
-        test_text = "一貫性テスト用のレシピテキスト"
+        test_text = CONSISTENCY_TEXT
         
-        # Generate embedding twice
-        embedding1 = self.client.get_single_embedding(test_text)
-        time.sleep(0.1)  # Small delay
-        embedding2 = self.client.get_single_embedding(test_text)
+        # Generate embedding twice (only the first may come from the cache)
+        if self._testMethodName in self._batch_results:
+            embedding1, embedding2 = self._batch_results[self._testMethodName]
+            self._api_texts.extend([test_text, test_text])
+        else:
+            embedding1 = self._get_single_embedding(test_text)
+            time.sleep(0.1)  # Small delay
+            embedding2 = self._get_single_embedding(test_text, use_cache=False)
         
         # Record costs
-        token_count = self.client._calculate_token_count([test_text]) * 2
-        self.test_costs.append(token_count)
+        self._record_cost()
         
         # Should be nearly identical (deterministic within floating point precision)
         similarity = self._cosine_similarity(embedding1, embedding2)
@@ -190,19 +272,22 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
                      "Rate limit test skipped by environment variable")
     def test_batch_processing_performance(self):
         """Test performance with batch processing"""
-        batch_texts = [f"レシピ{i}: 材料と調理法の説明文" for i in range(20)]
+        batch_texts = BATCH_TEXTS
         
         start_time = time.time()
-        embeddings = self.client.get_embeddings_sync(batch_texts)
+        embeddings = self._get_embeddings(batch_texts)
         duration = time.time() - start_time
         
         # Record costs
-        token_count = self.client._calculate_token_count(batch_texts)
-        self.test_costs.append(token_count)
+        self._record_cost()
         
         # Assertions
         self.assertEqual(len(embeddings), len(batch_texts))
         
+        if self._testMethodName in self._batch_results or not self._api_texts:
+            print(f"✓ バッチ処理テスト完了（Batch API/キャッシュ取得のため処理時間は測定しません）")
+            return
+        
         # Performance check (should be faster than individual calls)
         per_text_time = duration / len(batch_texts)
         self.assertLess(per_text_time, 1.0, "バッチ処理は1テキストあたり1秒未満で完了するはず")
@@ -213,11 +298,10 @@ class TestOpenAIEmbeddingIntegration(unittest.TestCase):
     
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors"""
-        import math
-        
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = math.sqrt(sum(a * a for a in vec1))
-        norm2 = math.sqrt(sum(b * b for b in vec2))
+        # map/hypot run the element loops in C instead of Python generators
+        dot_product = sum(map(operator.mul, vec1, vec2))
+        norm1 = math.hypot(*vec1)
+        norm2 = math.hypot(*vec2)
         
         if norm1 == 0 or norm2 == 0:
             return 0